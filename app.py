@@ -2,9 +2,10 @@
 Chatbot RH - Fonction Publique
 Application Flask principale avec authentification
 """
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, g, Response
 from flask_cors import CORS
 import os
+import time
 from datetime import timedelta
 from dotenv import load_dotenv
 
@@ -20,7 +21,7 @@ CORS(app, supports_credentials=True)
 # =============================================
 # Import des contrôleurs
 # =============================================
-from app.controllers.chat_controller import chat_api, feedback_api
+from app.controllers.chat_controller import chat_api, chat_stream_api, chat_batch_api, feedback_api
 from app.controllers.auth_controller import (
     login, register, logout, get_current_user, change_password,
     login_required, gestionnaire_required
@@ -36,7 +37,53 @@ from app.controllers.gestionnaire_controller import (
     dashboard_stats, liste_demandes_gestionnaire, liste_employes,
     detail_employe, analytics_chatbot, gerer_intents
 )
-from app.database.connection import get_db, execute_query
+from app.database.connection import get_db, execute_query, db_pool, prepared_statements
+from app.services.nlp_service import nlp_service
+from app.services.conversation_logger import conversation_logger
+from app.services.employee_cache import employee_cache
+from app.services.metrics import metrics, REQUEST_DURATION, CONTENT_TYPE, current_endpoint
+
+# =============================================
+# Métriques de performance (/metrics)
+# =============================================
+
+metrics.register_gauges("chatbot_answer_cache", "Cache des réponses", nlp_service.answer_cache.stats)
+metrics.register_gauges("chatbot_conversation_log", "Journal des conversations", conversation_logger.stats)
+metrics.register_gauges("chatbot_entity_tier", "Extraction d'entités par niveau", nlp_service.entity_extractor.stats)
+metrics.register_gauges("chatbot_nlp_pool", "Pool de processus NLP", nlp_service.worker_pool.stats)
+metrics.register_gauges("chatbot_micro_batch", "Micro-lots /chat", nlp_service.batcher.stats)
+metrics.register_gauges("chatbot_employe_cache", "Cache des fiches employés", employee_cache.stats)
+metrics.register_gauges("chatbot_db_pool", "Pool de connexions PostgreSQL", db_pool.stats)
+metrics.register_gauges("chatbot_db_prepared", "Requêtes SQL préparées", prepared_statements.stats)
+
+@app.before_request
+def start_intent_listener():
+    # Chaque worker écoute les modifications d'intentions faites par les autres ;
+    # l'écoute démarre à sa première requête, pas à l'import de l'application
+    nlp_service.start_intent_listener()
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    # Les étapes mesurées pendant la requête (timed) sont rattachées à sa route
+    current_endpoint.set(request.url_rule.rule if request.url_rule else "inconnu")
+
+@app.after_request
+def record_request_duration(response):
+    """Durée de chaque requête, par route (modèle d'URL) et code de statut"""
+    start = g.pop("request_start", None)
+    if start is not None:
+        endpoint = request.url_rule.rule if request.url_rule else "inconnu"
+        REQUEST_DURATION.observe(
+            (endpoint, request.method, str(response.status_code)),
+            time.perf_counter() - start
+        )
+    return response
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Métriques au format texte Prometheus (latences par route et par étape)"""
+    return Response(metrics.render(), content_type=CONTENT_TYPE)
 
 # =============================================
 # Routes des pages HTML
@@ -113,6 +160,16 @@ def chat():
     """API du chatbot"""
     return chat_api()
 
+@app.route('/chat/stream', methods=['POST'])
+def chat_stream():
+    """Réponse du chatbot en streaming (Server-Sent Events)"""
+    return chat_stream_api()
+
+@app.route('/chat/batch', methods=['POST'])
+def chat_batch():
+    """Classification d'un lot de messages"""
+    return chat_batch_api()
+
 @app.route('/chat/feedback', methods=['POST'])
 def chat_feedback():
     """Feedback sur les réponses du chatbot"""
@@ -233,14 +290,12 @@ def api_profil_employe():
     try:
         employe_id = session.get('employe_id')
         
-        query = """
-            SELECT id, matricule, nom, prenom, email, telephone, 
-                   departement, poste, date_embauche, solde_conges
-            FROM employes WHERE id = %s
-        """
-        employe = execute_query(query, (employe_id,), fetch_one=True)
+        employe = employee_cache.get(employe_id)
         
         if employe:
+            fields = ("id", "matricule", "nom", "prenom", "email", "telephone",
+                      "departement", "poste", "date_embauche", "solde_conges")
+            employe = {key: employe[key] for key in fields}
             from decimal import Decimal
             for key, value in employe.items():
                 if isinstance(value, Decimal):
@@ -330,7 +385,13 @@ if __name__ == "__main__":
     print("   - /gestionnaire → Dashboard RH (auth)")
     print("   - /test-db   → Test connexion PostgreSQL")
     print("   - /init-db   → Initialiser la base de données")
+    print("   - /metrics   → Métriques Prometheus")
     print("\n🔐 Compte démo: admin@rh.fr / admin123")
     print("="*50 + "\n")
     
+    # Chargement du modèle SpaCy et des intentions avant la première requête
+    # (en mode debug, seul le processus lancé par le reloader sert les requêtes)
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        nlp_service.warmup()
+    
     app.run(debug=True, port=5000, host="0.0.0.0")
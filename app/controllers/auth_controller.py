@@ -5,6 +5,7 @@ Gère la connexion, inscription et gestion de session des utilisateurs
 from flask import request, jsonify, session, redirect, url_for
 from werkzeug.security import generate_password_hash, check_password_hash
 from app.database.connection import execute_query
+from app.services.employee_cache import employee_cache
 from functools import wraps
 import re
 
@@ -187,13 +188,13 @@ def get_current_user():
         return jsonify({"authenticated": False}), 401
     
     try:
-        query = """
-            SELECT id, matricule, nom, prenom, email, role, departement, poste, solde_conges
-            FROM employes WHERE id = %s
-        """
-        user = execute_query(query, (session['employe_id'],), fetch_one=True)
+        # Fiche lue depuis le cache des employés (appelé à chaque chargement de page)
+        employe = employee_cache.get(session['employe_id'])
         
-        if user:
+        if employe:
+            fields = ("id", "matricule", "nom", "prenom", "email", "role",
+                      "departement", "poste", "solde_conges")
+            user = {key: employe[key] for key in fields}
             from decimal import Decimal
             for key, value in user.items():
                 if isinstance(value, Decimal):
@@ -241,6 +242,7 @@ def change_password():
         hashed = generate_password_hash(new_password)
         update_query = "UPDATE employes SET mot_de_passe = %s WHERE id = %s"
         execute_query(update_query, (hashed, session['employe_id']), commit=True)
+        employee_cache.invalidate(session['employe_id'])
         
         return jsonify({"success": True, "message": "Mot de passe modifié avec succès"})
     
@@ -2,16 +2,24 @@
 Contrôleur du Chatbot RH
 Gère les requêtes de chat et les interactions avec le chatbot
 """
-from flask import request, jsonify, session
+from flask import request, jsonify, session, Response, stream_with_context
 from app.services.nlp_service import nlp_service
+import json
+import os
 import uuid
 
+# Nombre maximal de messages acceptés par /chat/batch
+CHAT_BATCH_MAX_MESSAGES = int(os.environ.get("CHAT_BATCH_MAX_MESSAGES", 1000))
+# Taille maximale des lots nlp.pipe demandée via batch_size (valeur ramenée à ce plafond)
+CHAT_BATCH_MAX_BATCH_SIZE = int(os.environ.get("CHAT_BATCH_MAX_BATCH_SIZE", 256))
+
 
 def chat_api():
     """
     API principale du chatbot
     POST /chat
-    Body: { "message": "...", "session_id": "..." (optionnel) }
+    Body: { "message": "...", "session_id": "..." (optionnel),
+            "entities": true/false (optionnel, true par défaut) }
     """
     try:
         data = request.get_json(force=True)
@@ -29,11 +37,15 @@ def chat_api():
         # Récupérer l'ID de l'employé si connecté
         employe_id = session.get("employe_id") if hasattr(session, 'get') else None
         
+        # Les entités ne sont extraites que si l'appelant les demande
+        with_entities = data.get("entities", True) is not False
+        
         # Traiter le message
         result = nlp_service.process_message(
             message=message,
             employe_id=employe_id,
-            session_id=session_id
+            session_id=session_id,
+            with_entities=with_entities
         )
         
         # Ajouter l'ID de session à la réponse
@@ -50,6 +62,110 @@ def chat_api():
         }), 500
 
 
+def _sse(event: str, data: dict) -> str:
+    """Formate un événement Server-Sent Events"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def chat_stream_api():
+    """
+    Variante de /chat en streaming (Server-Sent Events)
+    POST /chat/stream
+    Body: identique à /chat
+    Événements: answer (intent, answer, confidence, session_id), suggestions,
+                entities (si demandées), done (conversation_id), error
+    """
+    try:
+        data = request.get_json(force=True)
+        message = data.get("message", "").strip()
+        
+        if not message:
+            return jsonify({
+                "error": "Message vide",
+                "answer": "Veuillez entrer un message."
+            }), 400
+        
+        session_id = data.get("session_id") or str(uuid.uuid4())
+        employe_id = session.get("employe_id") if hasattr(session, 'get') else None
+        with_entities = data.get("entities", True) is not False
+        
+        def generate():
+            try:
+                for event, payload in nlp_service.stream_message(
+                    message=message,
+                    employe_id=employe_id,
+                    session_id=session_id,
+                    with_entities=with_entities
+                ):
+                    if event == "answer":
+                        payload["session_id"] = session_id
+                    yield _sse(event, payload)
+            except Exception as e:
+                print(f"Erreur chat_stream_api: {e}")
+                yield _sse("error", {"error": str(e)})
+        
+        return Response(
+            stream_with_context(generate()),
+            mimetype="text/event-stream",
+            # Pas de mise en tampon par un proxy : chaque événement part immédiatement
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+    
+    except Exception as e:
+        print(f"Erreur chat_stream_api: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+def chat_batch_api():
+    """
+    Classification d'un lot de messages (intégrations, traitements de nuit)
+    POST /chat/batch
+    Body: { "messages": ["...", ...], "session_id": "..." (optionnel),
+            "entities": true/false (optionnel), "batch_size": 64 (optionnel) }
+    """
+    try:
+        data = request.get_json(force=True)
+        messages = data.get("messages")
+        
+        if not isinstance(messages, list) or not messages:
+            return jsonify({"error": "Liste de messages requise"}), 400
+        
+        if len(messages) > CHAT_BATCH_MAX_MESSAGES:
+            return jsonify({
+                "error": f"Trop de messages (maximum {CHAT_BATCH_MAX_MESSAGES})"
+            }), 400
+        
+        if not all(isinstance(m, str) for m in messages):
+            return jsonify({"error": "Chaque message doit être une chaîne de caractères"}), 400
+        
+        messages = [m.strip() for m in messages]
+        if not all(messages):
+            return jsonify({"error": "Message vide dans le lot"}), 400
+        
+        session_id = data.get("session_id") or str(uuid.uuid4())
+        employe_id = session.get("employe_id") if hasattr(session, 'get') else None
+        with_entities = data.get("entities", True) is not False
+        batch_size = data.get("batch_size")
+        if batch_size is not None:
+            if isinstance(batch_size, bool) or not str(batch_size).isdigit() or int(batch_size) < 1:
+                return jsonify({"error": "batch_size doit être un entier positif"}), 400
+            batch_size = min(int(batch_size), CHAT_BATCH_MAX_BATCH_SIZE)
+        
+        results = nlp_service.process_messages(
+            messages,
+            employe_id=employe_id,
+            session_id=session_id,
+            with_entities=with_entities,
+            batch_size=batch_size
+        )
+        
+        return jsonify({"session_id": session_id, "results": results})
+    
+    except Exception as e:
+        print(f"Erreur chat_batch_api: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
 def feedback_api():
     """
     API pour enregistrer le feedback utilisateur
@@ -61,12 +177,14 @@ def feedback_api():
         conversation_id = data.get("conversation_id")
         feedback = data.get("feedback")  # 1 = positif, -1 = négatif
         
-        if not conversation_id or feedback not in [1, -1]:
+        if not str(conversation_id).isdigit() or feedback not in [1, -1]:
             return jsonify({"error": "Paramètres invalides"}), 400
         
-        from app.database.connection import execute_query
-        query = "UPDATE conversations SET feedback = %s WHERE id = %s"
-        execute_query(query, (feedback, conversation_id), commit=True)
+        from app.services.conversation_logger import conversation_logger
+        
+        # La conversation peut encore être dans la file d'écriture différée
+        if not conversation_logger.set_feedback(int(conversation_id), feedback):
+            return jsonify({"error": "Conversation introuvable"}), 404
         
         return jsonify({"success": True, "message": "Merci pour votre feedback !"})
     
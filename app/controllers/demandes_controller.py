@@ -3,10 +3,35 @@ Contrôleur des demandes RH
 Gère les demandes de congés, remboursements, attestations, etc.
 """
 from flask import request, jsonify, session
-from app.database.connection import execute_query
+from app.database.connection import execute_query, execute_prepared, register_query, transaction
+from app.services.employee_cache import employee_cache
 from datetime import datetime, timedelta
 from decimal import Decimal
 
+# Solde lu en base à chaque contrôle : le cache des fiches peut être en retard
+# sur une approbation traitée par un autre worker
+SOLDE_CONGES = register_query(
+    "solde_conges_employe", "SELECT solde_conges FROM employes WHERE id = %s"
+)
+
+# Requêtes du traitement d'une demande, préparées une fois par connexion
+TRAITER_DEMANDE = register_query("traiter_demande", """
+    UPDATE demandes 
+    SET statut = %s, commentaire_gestionnaire = %s, 
+        traite_par = %s, date_traitement = NOW(), updated_at = NOW()
+    WHERE id = %s
+    RETURNING employe_id, type_demande, nb_jours
+""")
+DEDUIRE_SOLDE = register_query("deduire_solde_conges", """
+    UPDATE employes 
+    SET solde_conges = solde_conges - %s 
+    WHERE id = %s
+""")
+INSERER_NOTIFICATION = register_query("inserer_notification", """
+    INSERT INTO notifications (employe_id, titre, message, type_notification)
+    VALUES (%s, %s, %s, %s)
+""")
+
 
 def creer_demande():
     """
@@ -76,10 +101,11 @@ def creer_demande():
 
 
 def get_solde_conges(employe_id: int):
-    """Récupère le solde de congés d'un employé"""
-    query = "SELECT solde_conges FROM employes WHERE id = %s"
-    result = execute_query(query, (employe_id,), fetch_one=True)
-    return float(result['solde_conges']) if result else None
+    """Récupère le solde de congés d'un employé (sans cache)"""
+    result = execute_prepared(SOLDE_CONGES, (employe_id,), fetch_one=True)
+    if not result or result['solde_conges'] is None:
+        return None
+    return float(result['solde_conges'])
 
 
 def liste_demandes():
@@ -92,7 +118,10 @@ def liste_demandes():
         statut = request.args.get("statut")
         
         query = """
-            SELECT d.*, e.nom, e.prenom 
+            SELECT d.id, d.employe_id, d.type_demande, d.sous_type, d.date_debut,
+                   d.date_fin, d.nb_jours, d.montant, d.motif, d.justificatif_path,
+                   d.statut, d.commentaire_gestionnaire, d.traite_par,
+                   d.date_traitement, d.created_at, d.updated_at, e.nom, e.prenom
             FROM demandes d
             JOIN employes e ON d.employe_id = e.id
             WHERE 1=1
@@ -109,7 +138,9 @@ def liste_demandes():
         
         query += " ORDER BY d.created_at DESC"
         
-        demandes = execute_query(query, tuple(params), fetch_all=True) or []
+        # Une requête préparée par combinaison de filtres
+        name = "liste_demandes" + ("_employe" if employe_id else "") + ("_statut" if statut else "")
+        demandes = execute_prepared(register_query(name, query), tuple(params), fetch_all=True) or []
         
         # Convertir les dates et Decimal pour JSON
         for d in demandes:
@@ -142,39 +173,35 @@ def traiter_demande():
         
         nouveau_statut = "approuve" if action == "approuver" else "refuse"
         
-        # Mettre à jour la demande
-        query = """
-            UPDATE demandes 
-            SET statut = %s, commentaire_gestionnaire = %s, 
-                traite_par = %s, date_traitement = NOW(), updated_at = NOW()
-            WHERE id = %s
-            RETURNING employe_id, type_demande, nb_jours
-        """
-        result = execute_query(
-            query,
-            (nouveau_statut, commentaire, gestionnaire_id, demande_id),
-            fetch_one=True,
-            commit=True
-        )
-        
-        if result:
-            # Si congé approuvé, déduire du solde
-            if action == "approuver" and result['type_demande'] == "conge" and result['nb_jours']:
-                update_solde = """
-                    UPDATE employes 
-                    SET solde_conges = solde_conges - %s 
-                    WHERE id = %s
-                """
-                execute_query(update_solde, (result['nb_jours'], result['employe_id']), commit=True)
-            
-            # Notifier l'employé
-            statut_texte = "approuvée" if action == "approuver" else "refusée"
-            creer_notification(
-                employe_id=result['employe_id'],
-                titre=f"Demande {statut_texte}",
-                message=f"Votre demande de {result['type_demande']} a été {statut_texte}. {commentaire}",
-                type_notification="demande"
+        # Demande, solde et notification : une seule transaction, un seul commit
+        solde_modifie = False
+        with transaction() as tx:
+            # Mettre à jour la demande
+            result = tx.execute_prepared(
+                TRAITER_DEMANDE,
+                (nouveau_statut, commentaire, gestionnaire_id, demande_id),
+                fetch_one=True
             )
+            
+            if result:
+                # Si congé approuvé, déduire du solde
+                if action == "approuver" and result['type_demande'] == "conge" and result['nb_jours']:
+                    tx.execute_prepared(DEDUIRE_SOLDE, (result['nb_jours'], result['employe_id']))
+                    solde_modifie = True
+                
+                # Notifier l'employé
+                statut_texte = "approuvée" if action == "approuver" else "refusée"
+                creer_notification(
+                    employe_id=result['employe_id'],
+                    titre=f"Demande {statut_texte}",
+                    message=f"Votre demande de {result['type_demande']} a été {statut_texte}. {commentaire}",
+                    type_notification="demande",
+                    tx=tx
+                )
+        
+        # Après le commit : une lecture concurrente ne peut plus remettre l'ancien solde en cache
+        if solde_modifie:
+            employee_cache.invalidate(result['employe_id'])
         
         return jsonify({
             "success": True,
@@ -213,13 +240,16 @@ def annuler_demande():
         return jsonify({"error": str(e)}), 500
 
 
-def creer_notification(employe_id: int, titre: str, message: str, type_notification: str = "info"):
-    """Crée une notification pour un employé"""
-    query = """
-        INSERT INTO notifications (employe_id, titre, message, type_notification)
-        VALUES (%s, %s, %s, %s)
+def creer_notification(employe_id: int, titre: str, message: str, type_notification: str = "info", tx=None):
+    """
+    Crée une notification pour un employé
+    Avec `tx` (transaction en cours), la notification est validée avec elle.
     """
-    execute_query(query, (employe_id, titre, message, type_notification), commit=True)
+    params = (employe_id, titre, message, type_notification)
+    if tx is not None:
+        tx.execute_prepared(INSERER_NOTIFICATION, params)
+    else:
+        execute_prepared(INSERER_NOTIFICATION, params, commit=True)
 
 
 def creer_notification_gestionnaires(titre: str, message: str, type_notification: str = "info"):
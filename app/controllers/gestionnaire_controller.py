@@ -298,6 +298,19 @@ def analytics_chatbot():
         result = execute_query(query, fetch_one=True)
         analytics['confiance_moyenne'] = round(float(result['avg_confidence']) * 100, 1) if result and result['avg_confidence'] else None
         
+        # Efficacité du cache des réponses (worker courant)
+        from app.services.nlp_service import nlp_service
+        analytics['cache_reponses'] = nlp_service.answer_cache.stats()
+        # Répartition de l'extraction d'entités par niveau (motifs, NER, aucune)
+        analytics['extraction_entites'] = nlp_service.entity_extractor.stats()
+        analytics['pool_nlp'] = nlp_service.worker_pool.stats()
+        analytics['micro_lots'] = nlp_service.batcher.stats()
+        from app.services.employee_cache import employee_cache
+        analytics['cache_employes'] = employee_cache.stats()
+        # Part des exécutions SQL réutilisant une requête préparée
+        from app.database.connection import prepared_statements
+        analytics['requetes_preparees'] = prepared_statements.stats()
+        
         return jsonify(analytics)
     
     except Exception as e:
@@ -351,9 +364,10 @@ def gerer_intents():
                 commit=True
             )
             
-            # Recharger les intents dans le service NLP
+            # Appliquer la modification dans ce worker sans attendre la notification ;
+            # les autres workers la reçoivent via le trigger NOTIFY de la table intents
             from app.services.nlp_service import nlp_service
-            nlp_service.reload_intents()
+            nlp_service.apply_intent_change(intent_name)
             
             return jsonify({
                 "success": True,
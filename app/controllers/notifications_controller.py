@@ -3,10 +3,35 @@ Contrôleur des notifications RH
 Gère les notifications et les échéances
 """
 from flask import request, jsonify, session
-from app.database.connection import execute_query
+from app.database.connection import execute_query, execute_prepared, register_query, transaction
 from datetime import datetime, timedelta
 from decimal import Decimal
 
+# Compteur affiché à chaque chargement de page, préparé une fois par connexion
+NOTIFICATIONS_NON_LUES = register_query(
+    "compte_notifications_non_lues",
+    "SELECT COUNT(*) as count FROM notifications WHERE employe_id = %s AND lue = FALSE"
+)
+
+# Requêtes de la vérification périodique des échéances, préparées une fois par connexion.
+# Les lignes sont verrouillées jusqu'au commit : deux vérifications
+# simultanées ne notifient pas deux fois la même échéance.
+ECHEANCES_A_NOTIFIER = register_query("echeances_a_notifier", """
+    SELECT e.*, emp.nom, emp.prenom, emp.email
+    FROM echeances e
+    JOIN employes emp ON e.employe_id = emp.id
+    WHERE e.notification_envoyee = FALSE
+    AND e.date_echeance <= %s
+    FOR UPDATE OF e SKIP LOCKED
+""")
+NOTIFIER_ECHEANCE = register_query("notifier_echeance", """
+    INSERT INTO notifications (employe_id, titre, message, type_notification)
+    VALUES (%s, %s, %s, 'echeance')
+""")
+MARQUER_ECHEANCE_NOTIFIEE = register_query(
+    "marquer_echeance_notifiee", "UPDATE echeances SET notification_envoyee = TRUE WHERE id = %s"
+)
+
 
 def get_notifications():
     """
@@ -32,7 +57,9 @@ def get_notifications():
         
         query += " ORDER BY created_at DESC LIMIT 50"
         
-        notifications = execute_query(query, tuple(params), fetch_all=True) or []
+        # Une requête préparée par variante (toutes / non lues)
+        name = "liste_notifications" + ("_non_lues" if non_lues_only else "")
+        notifications = execute_prepared(register_query(name, query), tuple(params), fetch_all=True) or []
         
         # Convertir les dates pour JSON
         for n in notifications:
@@ -40,8 +67,7 @@ def get_notifications():
                 n['created_at'] = n['created_at'].isoformat()
         
         # Compter les non lues
-        count_query = "SELECT COUNT(*) as count FROM notifications WHERE employe_id = %s AND lue = FALSE"
-        count_result = execute_query(count_query, (employe_id,), fetch_one=True)
+        count_result = execute_prepared(NOTIFICATIONS_NON_LUES, (employe_id,), fetch_one=True)
         non_lues_count = count_result['count'] if count_result else 0
         
         return jsonify({
@@ -102,46 +128,36 @@ def verifier_echeances():
     try:
         today = datetime.now().date()
         
-        # Trouver les échéances à venir non notifiées
-        query = """
-            SELECT e.*, emp.nom, emp.prenom, emp.email
-            FROM echeances e
-            JOIN employes emp ON e.employe_id = emp.id
-            WHERE e.notification_envoyee = FALSE
-            AND e.date_echeance <= %s
-        """
-        
         # Échéances dans les 7 prochains jours
         date_limite = today + timedelta(days=7)
-        echeances = execute_query(query, (date_limite,), fetch_all=True) or []
         
         notifications_creees = 0
         
-        for ech in echeances:
-            jours_restants = (ech['date_echeance'] - today).days
+        # Notifications et marquage des échéances : une seule transaction, un seul commit
+        with transaction() as tx:
+            # Trouver les échéances à venir non notifiées (verrouillées jusqu'au commit)
+            echeances = tx.execute_prepared(ECHEANCES_A_NOTIFIER, (date_limite,), fetch_all=True) or []
             
-            if jours_restants <= ech.get('jours_avant_notification', 7):
-                # Créer la notification
-                titre = f"Échéance RH : {ech['type_echeance']}"
-                if jours_restants == 0:
-                    message = f"L'échéance '{ech['type_echeance']}' est aujourd'hui !"
-                elif jours_restants < 0:
-                    message = f"L'échéance '{ech['type_echeance']}' est dépassée de {abs(jours_restants)} jour(s)."
-                else:
-                    message = f"L'échéance '{ech['type_echeance']}' est dans {jours_restants} jour(s). {ech.get('description', '')}"
-                
-                # Insérer la notification
-                insert_query = """
-                    INSERT INTO notifications (employe_id, titre, message, type_notification)
-                    VALUES (%s, %s, %s, 'echeance')
-                """
-                execute_query(insert_query, (ech['employe_id'], titre, message), commit=True)
-                
-                # Marquer l'échéance comme notifiée
-                update_query = "UPDATE echeances SET notification_envoyee = TRUE WHERE id = %s"
-                execute_query(update_query, (ech['id'],), commit=True)
+            for ech in echeances:
+                jours_restants = (ech['date_echeance'] - today).days
                 
-                notifications_creees += 1
+                if jours_restants <= ech.get('jours_avant_notification', 7):
+                    # Créer la notification
+                    titre = f"Échéance RH : {ech['type_echeance']}"
+                    if jours_restants == 0:
+                        message = f"L'échéance '{ech['type_echeance']}' est aujourd'hui !"
+                    elif jours_restants < 0:
+                        message = f"L'échéance '{ech['type_echeance']}' est dépassée de {abs(jours_restants)} jour(s)."
+                    else:
+                        message = f"L'échéance '{ech['type_echeance']}' est dans {jours_restants} jour(s). {ech.get('description', '')}"
+                    
+                    # Insérer la notification
+                    tx.execute_prepared(NOTIFIER_ECHEANCE, (ech['employe_id'], titre, message))
+                    
+                    # Marquer l'échéance comme notifiée
+                    tx.execute_prepared(MARQUER_ECHEANCE_NOTIFIEE, (ech['id'],))
+                    
+                    notifications_creees += 1
         
         return jsonify({
             "success": True,
@@ -0,0 +1,107 @@
+"""
+Accès asynchrone à PostgreSQL (asyncpg) pour le service ASGI (asgi.py)
+asyncpg est une dépendance optionnelle : le reste de l'application n'en a pas besoin.
+"""
+import asyncio
+import os
+import time
+
+from app.database.connection import DB_CONFIG, prepared_statements, _sql_operation
+from app.services.metrics import DB_QUERY_DURATION, DB_POOL_WAIT
+
+try:
+    import asyncpg
+except ImportError:
+    asyncpg = None
+
+
+class AsyncDatabase:
+    """
+    Pool de connexions asyncpg, créé au premier usage dans la boucle asyncio courante
+
+    Les requêtes sont désignées par leur nom dans le registre des requêtes
+    préparées (register_query) : le texte en $1, $2... est celui du registre et
+    asyncpg garde chaque requête préparée sur ses connexions.
+    Une requête en attente de PostgreSQL n'occupe aucun thread.
+    """
+
+    def __init__(self, min_size: int = 1, max_size: int = 20, timeout: float = 30.0):
+        """
+        Args:
+            min_size: Connexions ouvertes en permanence
+            max_size: Nombre maximal de connexions
+            timeout: Attente maximale d'une connexion libre, en secondes
+        """
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self._pool = None
+        self._lock = None
+
+    async def _get_pool(self):
+        if self._pool is not None:
+            return self._pool
+        if asyncpg is None:
+            raise RuntimeError("asyncpg n'est pas installé (pip install asyncpg)")
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._pool is None:
+                self._pool = await asyncpg.create_pool(
+                    host=DB_CONFIG["host"],
+                    port=int(DB_CONFIG["port"]),
+                    user=DB_CONFIG["user"],
+                    password=DB_CONFIG["password"],
+                    database=DB_CONFIG["database"],
+                    min_size=self.min_size,
+                    max_size=self.max_size,
+                )
+        return self._pool
+
+    async def _run(self, method: str, name: str, params):
+        statement = prepared_statements.get(name)
+        pool = await self._get_pool()
+
+        start = time.perf_counter()
+        conn = await pool.acquire(timeout=self.timeout)
+        DB_POOL_WAIT.observe((), time.perf_counter() - start)
+        try:
+            return await getattr(conn, method)(statement.prepared_query, *params)
+        finally:
+            await pool.release(conn)
+            DB_QUERY_DURATION.observe((_sql_operation(statement.query),), time.perf_counter() - start)
+
+    async def fetchrow(self, name: str, *params):
+        """Première ligne de la requête enregistrée `name` (ou None)"""
+        return await self._run("fetchrow", name, params)
+
+    async def fetch(self, name: str, *params):
+        """Toutes les lignes de la requête enregistrée `name`"""
+        return await self._run("fetch", name, params)
+
+    async def execute(self, name: str, *params):
+        """Exécute la requête enregistrée `name` (validée immédiatement)"""
+        return await self._run("execute", name, params)
+
+    async def close(self):
+        """Ferme le pool (arrêt du serveur ASGI)"""
+        if self._pool is not None:
+            pool, self._pool = self._pool, None
+            await pool.close()
+
+    def stats(self):
+        """Connexions ouvertes et libres du pool"""
+        pool = self._pool
+        return {
+            "size": pool.get_size() if pool is not None else 0,
+            "idle": pool.get_idle_size() if pool is not None else 0,
+            "max_size": self.max_size,
+        }
+
+
+# Pool asynchrone partagé par le service ASGI
+async_db = AsyncDatabase(
+    min_size=int(os.environ.get("ASYNC_DB_POOL_MIN", 1)),
+    max_size=int(os.environ.get("ASYNC_DB_POOL_MAX", 20)),
+    timeout=float(os.environ.get("ASYNC_DB_POOL_TIMEOUT", 30)),
+)
@@ -2,10 +2,23 @@
 Connexion à la base de données PostgreSQL
 """
 import psycopg2
+from psycopg2.extensions import (
+    ISOLATION_LEVEL_AUTOCOMMIT, TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_UNKNOWN
+)
 from psycopg2.extras import RealDictCursor
+from psycopg2.errors import FeatureNotSupported, InvalidSqlStatementName
+from psycopg2.pool import PoolError
 import os
+import re
+import select
+import threading
+import time
+import weakref
+from contextlib import contextmanager
 from dotenv import load_dotenv
 
+from app.services.metrics import DB_QUERY_DURATION, DB_POOL_WAIT
+
 load_dotenv()
 
 # Configuration de la base de données
@@ -18,9 +31,10 @@ DB_CONFIG = {
 }
 
 
-def get_db():
+def create_connection():
     """
-    Retourne une connexion à la base de données PostgreSQL
+    Ouvre une nouvelle connexion PostgreSQL, hors du pool
+    (connexions de longue durée, ex: NotificationListener)
     """
     return psycopg2.connect(
         host=DB_CONFIG["host"],
@@ -31,6 +45,268 @@ def get_db():
     )
 
 
+class PooledConnection:
+    """
+    Connexion empruntée au pool
+    Se comporte comme la connexion psycopg2 sous-jacente ; close() la rend au
+    pool au lieu de la fermer.
+    """
+    
+    __slots__ = ("_pool", "_conn", "_created_at")
+    
+    def __init__(self, pool, conn, created_at):
+        object.__setattr__(self, "_pool", pool)
+        object.__setattr__(self, "_conn", conn)
+        object.__setattr__(self, "_created_at", created_at)
+    
+    def __getattr__(self, name):
+        conn = object.__getattribute__(self, "_conn")
+        if conn is None:
+            raise psycopg2.InterfaceError("connection already closed")
+        return getattr(conn, name)
+    
+    def __setattr__(self, name, value):
+        # autocommit, isolation_level... s'appliquent à la vraie connexion
+        setattr(self._conn, name, value)
+    
+    @property
+    def closed(self):
+        return 1 if self._conn is None else self._conn.closed
+    
+    def close(self):
+        """Rend la connexion au pool"""
+        conn = self._conn
+        if conn is not None:
+            object.__setattr__(self, "_conn", None)
+            self._pool.putconn(conn, self._created_at)
+    
+    def __enter__(self):
+        self._conn.__enter__()
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        return self._conn.__exit__(exc_type, exc_value, traceback)
+    
+    def __del__(self):
+        # Connexion oubliée par l'appelant : elle retourne au pool
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class ConnectionPool:
+    """
+    Pool de connexions PostgreSQL borné et thread-safe
+    
+    - Au plus `maxconn` connexions ouvertes ; au-delà, l'appelant attend qu'une
+      connexion soit rendue (au plus `timeout` secondes, puis PoolError).
+    - Une connexion inutilisée depuis plus de `health_check_interval` secondes
+      est vérifiée (SELECT 1) avant d'être prêtée ; une connexion cassée est
+      remplacée.
+    - Les connexions inactives depuis plus de `max_idle` secondes sont fermées
+      (en gardant `minconn` connexions), et toute connexion est renouvelée après
+      `max_lifetime` secondes.
+    - À la restitution, une transaction laissée ouverte est annulée.
+    - Les PID serveur des connexions ouvertes sont connus (owns_backend) : une
+      notification émise par ce processus peut être reconnue.
+    """
+    
+    def __init__(self, minconn=1, maxconn=10, timeout=30.0, max_idle=300.0,
+                 max_lifetime=3600.0, health_check_interval=30.0, connect=create_connection):
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.health_check_interval = health_check_interval
+        self.connect = connect
+        self._orphans = []
+        self._reset()
+        self._stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "timeouts": 0,
+            "created": 0,
+            "discarded": 0,
+            "health_checks": 0,
+        }
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._after_fork)
+    
+    def _reset(self):
+        # Connexions libres : (connexion, créée à, rendue à), la plus récente en dernier
+        self._idle = []
+        self._size = 0
+        self._cond = threading.Condition()
+        # PID serveur PostgreSQL de chaque connexion ouverte par ce processus
+        self._backend_pids = {}
+    
+    def _after_fork(self):
+        # Les connexions du parent ne doivent ni servir ni être fermées dans
+        # l'enfant (la fermeture terminerait aussi la session du parent)
+        self._orphans.extend(conn for conn, _, _ in self._idle)
+        self._reset()
+    
+    def getconn(self) -> PooledConnection:
+        """Emprunte une connexion (à rendre par close())"""
+        start = time.perf_counter()
+        deadline = time.monotonic() + self.timeout
+        waited = False
+        
+        while True:
+            conn = created_at = returned_at = None
+            with self._cond:
+                while not self._idle and self._size >= self.maxconn:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolError(
+                            f"Aucune connexion disponible après {self.timeout}s "
+                            f"({self.maxconn} connexions utilisées)"
+                        )
+                    waited = True
+                    self._cond.wait(remaining)
+                
+                if self._idle:
+                    conn, created_at, returned_at = self._idle.pop()
+                else:
+                    # Place réservée : la connexion est ouverte hors du verrou
+                    self._size += 1
+            
+            if conn is None:
+                try:
+                    conn = self.connect()
+                except Exception:
+                    self._release_slot()
+                    raise
+                created_at = time.monotonic()
+                with self._cond:
+                    self._stats["created"] += 1
+                    self._backend_pids[id(conn)] = conn.get_backend_pid()
+            elif not self._is_usable(conn, created_at, returned_at):
+                self._discard(conn)
+                continue
+            
+            with self._cond:
+                self._stats["checkouts"] += 1
+                if waited:
+                    self._stats["waits"] += 1
+            DB_POOL_WAIT.observe((), time.perf_counter() - start)
+            return PooledConnection(self, conn, created_at)
+    
+    def putconn(self, conn, created_at):
+        """Rend une connexion au pool (appelé par PooledConnection.close)"""
+        now = time.monotonic()
+        try:
+            if (conn.closed or conn.info.transaction_status == TRANSACTION_STATUS_UNKNOWN
+                    or now - created_at > self.max_lifetime):
+                self._discard(conn)
+                return
+            if conn.info.transaction_status != TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+            if conn.autocommit:
+                conn.autocommit = False
+        except Exception:
+            self._discard(conn)
+            return
+        
+        with self._cond:
+            self._idle.append((conn, created_at, now))
+            expired = self._expire_idle(now)
+            self._cond.notify()
+        for old in expired:
+            self._close(old)
+    
+    def _is_usable(self, conn, created_at, returned_at) -> bool:
+        now = time.monotonic()
+        if conn.closed or now - created_at > self.max_lifetime:
+            return False
+        if now - returned_at < self.health_check_interval:
+            return True
+        with self._cond:
+            self._stats["health_checks"] += 1
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.close()
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+    
+    def _expire_idle(self, now):
+        # Appelé sous verrou : les connexions libres les plus anciennes sont en tête
+        expired = []
+        while (self._idle and self._size > self.minconn
+               and now - self._idle[0][2] > self.max_idle):
+            expired.append(self._idle.pop(0)[0])
+            self._size -= 1
+            self._stats["discarded"] += 1
+        return expired
+    
+    def _discard(self, conn):
+        self._close(conn)
+        with self._cond:
+            self._stats["discarded"] += 1
+        self._release_slot()
+    
+    def _release_slot(self):
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+    
+    def _close(self, conn):
+        with self._cond:
+            self._backend_pids.pop(id(conn), None)
+        try:
+            conn.close()
+        except Exception:
+            pass
+    
+    def owns_backend(self, backend_pid) -> bool:
+        """Indique si le PID serveur PostgreSQL est celui d'une connexion de ce pool"""
+        with self._cond:
+            return backend_pid in self._backend_pids.values()
+    
+    def closeall(self):
+        """Ferme les connexions libres (les connexions prêtées le seront à leur retour)"""
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+        for conn, _, _ in idle:
+            self._close(conn)
+    
+    def stats(self):
+        """Compteurs du pool (connexions ouvertes, libres, attentes...)"""
+        with self._cond:
+            stats = dict(self._stats)
+            stats["size"] = self._size
+            stats["idle"] = len(self._idle)
+            stats["in_use"] = self._size - len(self._idle)
+            stats["maxconn"] = self.maxconn
+        return stats
+
+
+# Pool partagé par get_db et execute_query
+db_pool = ConnectionPool(
+    minconn=int(os.environ.get("DB_POOL_MIN", 1)),
+    maxconn=int(os.environ.get("DB_POOL_MAX", 10)),
+    timeout=float(os.environ.get("DB_POOL_TIMEOUT", 30)),
+    max_idle=float(os.environ.get("DB_POOL_MAX_IDLE", 300)),
+    max_lifetime=float(os.environ.get("DB_POOL_MAX_LIFETIME", 3600)),
+    health_check_interval=float(os.environ.get("DB_POOL_HEALTH_CHECK_INTERVAL", 30)),
+)
+
+
+def get_db():
+    """
+    Retourne une connexion à la base de données PostgreSQL
+    La connexion est empruntée au pool : close() la rend au pool.
+    """
+    return db_pool.getconn()
+
+
 def get_db_cursor(dict_cursor=True):
     """
     Retourne une connexion et un curseur
@@ -59,15 +335,41 @@ def execute_query(query, params=None, fetch_one=False, fetch_all=False, commit=F
     Returns:
         Le résultat de la requête ou None
     """
+    return _run_query(query, lambda cursor: cursor.execute(query, params),
+                      fetch_one, fetch_all, commit)
+
+
+def execute_prepared(name, params=None, fetch_one=False, fetch_all=False, commit=False):
+    """
+    Exécute une requête enregistrée par register_query (mêmes options que execute_query)
+    La requête est préparée (PREPARE) à sa première exécution sur chaque
+    connexion du pool, puis exécutée par son nom (EXECUTE) sans nouvelle planification.
+    
+    Args:
+        name: Nom de la requête enregistrée
+        params: Les paramètres de la requête (tuple)
+    """
+    statement = prepared_statements.get(name)
+    
+    def run(cursor):
+        try:
+            prepared_statements.execute(cursor, name, params)
+        except STALE_STATEMENT_ERRORS as e:
+            # Requête retirée de la session ou plan périmé : on la prépare de nouveau
+            cursor.connection.rollback()
+            prepared_statements.recover(cursor, name, e)
+            prepared_statements.execute(cursor, name, params)
+    
+    return _run_query(statement.query, run, fetch_one, fetch_all, commit)
+
+
+def _run_query(query, run, fetch_one, fetch_all, commit):
+    start = time.perf_counter()
     conn, cursor = get_db_cursor()
     try:
-        cursor.execute(query, params)
+        run(cursor)
         
-        result = None
-        if fetch_one:
-            result = cursor.fetchone()
-        elif fetch_all:
-            result = cursor.fetchall()
+        result = _fetch(cursor, fetch_one, fetch_all)
         
         if commit:
             conn.commit()
@@ -82,6 +384,322 @@ def execute_query(query, params=None, fetch_one=False, fetch_all=False, commit=F
     finally:
         cursor.close()
         conn.close()
+        DB_QUERY_DURATION.observe((_sql_operation(query),), time.perf_counter() - start)
+
+
+def _fetch(cursor, fetch_one, fetch_all):
+    if fetch_one:
+        return cursor.fetchone()
+    if fetch_all:
+        return cursor.fetchall()
+    return None
+
+
+class Transaction:
+    """
+    Unité de travail ouverte par transaction()
+    Toutes les requêtes passent par la même connexion et sont validées
+    ensemble, par un seul COMMIT, à la sortie du bloc.
+    """
+    
+    # Point de sauvegarde posé avant une requête déjà préparée : si elle est
+    # périmée, seule cette requête est annulée, puis préparée de nouveau
+    RETRY_SAVEPOINT = "requete_preparee"
+    
+    def __init__(self, cursor):
+        self.cursor = cursor
+    
+    def execute(self, query, params=None, fetch_one=False, fetch_all=False):
+        """Exécute une requête dans la transaction (mêmes options que execute_query, sans commit)"""
+        start = time.perf_counter()
+        try:
+            self.cursor.execute(query, params)
+            return _fetch(self.cursor, fetch_one, fetch_all)
+        finally:
+            DB_QUERY_DURATION.observe((_sql_operation(query),), time.perf_counter() - start)
+    
+    def execute_prepared(self, name, params=None, fetch_one=False, fetch_all=False):
+        """Exécute une requête enregistrée par register_query dans la transaction"""
+        statement = prepared_statements.get(name)
+        start = time.perf_counter()
+        try:
+            reused = prepared_statements.is_prepared(self.cursor.connection, name)
+            try:
+                prepared_statements.execute(
+                    self.cursor, name, params, savepoint=self.RETRY_SAVEPOINT if reused else None
+                )
+            except STALE_STATEMENT_ERRORS as e:
+                if not reused:
+                    raise
+                self.cursor.execute(f"ROLLBACK TO SAVEPOINT {self.RETRY_SAVEPOINT}")
+                prepared_statements.recover(self.cursor, name, e)
+                prepared_statements.execute(self.cursor, name, params)
+            return _fetch(self.cursor, fetch_one, fetch_all)
+        finally:
+            DB_QUERY_DURATION.observe((_sql_operation(statement.query),), time.perf_counter() - start)
+
+
+@contextmanager
+def transaction():
+    """
+    Exécute plusieurs requêtes sur une seule connexion, en une seule transaction
+    
+    Usage:
+        with transaction() as tx:
+            demande = tx.execute("UPDATE ... RETURNING ...", params, fetch_one=True)
+            tx.execute("INSERT ...", params)
+    
+    Le COMMIT a lieu à la sortie du bloc ; en cas d'exception, toutes les
+    modifications sont annulées et l'exception est propagée.
+    """
+    conn, cursor = get_db_cursor()
+    try:
+        yield Transaction(cursor)
+        with DB_QUERY_DURATION.time("COMMIT"):
+            conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+
+class PreparedStatement:
+    """Requête nommée : texte d'origine (%s) et texte préparé ($1, $2...)"""
+    
+    __slots__ = ("name", "query", "prepared_query", "param_count")
+    
+    PLACEHOLDER = re.compile(r"%(?:s|%|\()")
+    
+    def __init__(self, name, query):
+        self.name = name
+        self.query = query
+        self.param_count = 0
+        
+        def placeholder(match):
+            if match.group() == "%%":
+                return "%"
+            if match.group() == "%(":
+                raise ValueError(f"Requête {name} : paramètres nommés non supportés")
+            self.param_count += 1
+            return f"${self.param_count}"
+        
+        self.prepared_query = self.PLACEHOLDER.sub(placeholder, query)
+
+
+class PreparedStatementRegistry:
+    """
+    Registre des requêtes SQL fréquentes, préparées une fois par connexion
+    
+    PostgreSQL planifie chaque requête reçue en texte ; une requête préparée
+    (PREPARE) est analysée une seule fois par session puis exécutée par son nom.
+    Les connexions du pool étant réutilisées, le registre retient les requêtes
+    déjà préparées sur chacune d'elles.
+    
+    Une requête préparée peut devenir inutilisable sur une session : retirée
+    (DEALLOCATE ALL, InvalidSqlStatementName) ou dont le plan ne correspond plus
+    au schéma après un ALTER TABLE (FeatureNotSupported, "cached plan must not
+    change result type"). recover() remet alors la session en état pour une
+    nouvelle préparation.
+    """
+    
+    NAME_PATTERN = re.compile(r"^[a-z_][a-z0-9_]*$")
+    
+    def __init__(self):
+        self._statements = {}
+        # Noms des requêtes préparées, par connexion (oubliés avec la connexion)
+        self._prepared = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._stats = {"executions": 0, "reused": 0, "prepared": 0, "invalidated": 0}
+    
+    def register(self, name, query):
+        """
+        Enregistre une requête sous un nom et retourne ce nom
+        Réenregistrer le même texte sous le même nom est sans effet.
+        """
+        with self._lock:
+            statement = self._statements.get(name)
+            if statement is not None:
+                if statement.query != query:
+                    raise ValueError(f"Requête {name} déjà enregistrée avec un autre texte")
+                return name
+            if not self.NAME_PATTERN.match(name):
+                raise ValueError(f"Nom de requête invalide : {name}")
+            self._statements[name] = PreparedStatement(name, query)
+        return name
+    
+    def get(self, name) -> PreparedStatement:
+        try:
+            return self._statements[name]
+        except KeyError:
+            raise KeyError(f"Requête non enregistrée : {name}") from None
+    
+    def is_prepared(self, conn, name) -> bool:
+        """Indique si la requête `name` est déjà préparée sur la connexion"""
+        with self._lock:
+            return name in self._prepared.get(conn, ())
+    
+    def execute(self, cursor, name, params=None, savepoint=None):
+        """
+        Exécute la requête `name` sur le curseur, en la préparant si besoin
+        
+        Args:
+            savepoint: Si la requête est déjà préparée, point de sauvegarde posé
+                       dans le même envoi que l'EXECUTE (voir Transaction)
+        """
+        statement = self.get(name)
+        params = tuple(params or ())
+        if len(params) != statement.param_count:
+            raise ValueError(
+                f"Requête {name} : {statement.param_count} paramètres attendus, {len(params)} reçus"
+            )
+        
+        conn = cursor.connection
+        with self._lock:
+            prepared = self._prepared.setdefault(conn, set())
+            reused = name in prepared
+        if not reused:
+            cursor.execute(f"PREPARE {name} AS {statement.prepared_query}")
+            with self._lock:
+                prepared.add(name)
+        
+        sql = f"EXECUTE {name} ({', '.join(['%s'] * len(params))})" if params else f"EXECUTE {name}"
+        if reused and savepoint:
+            sql = f"SAVEPOINT {savepoint}; {sql}"
+        cursor.execute(sql, params or None)
+        
+        with self._lock:
+            self._stats["executions"] += 1
+            if reused:
+                self._stats["reused"] += 1
+            else:
+                self._stats["prepared"] += 1
+    
+    def forget(self, conn):
+        """Oublie les requêtes préparées sur une connexion"""
+        with self._lock:
+            self._prepared.pop(conn, None)
+    
+    def recover(self, cursor, name, error):
+        """
+        Remet la session en état après l'échec d'une requête préparée
+        (hors transaction en échec : après ROLLBACK ou ROLLBACK TO SAVEPOINT)
+        
+        - InvalidSqlStatementName : les requêtes de la session ont été retirées,
+          elles sont toutes oubliées
+        - FeatureNotSupported : le plan de `name` est périmé, elle est retirée
+          (DEALLOCATE) et oubliée
+        """
+        conn = cursor.connection
+        if isinstance(error, FeatureNotSupported):
+            cursor.execute(f"DEALLOCATE {name}")
+            with self._lock:
+                self._prepared.get(conn, set()).discard(name)
+                self._stats["invalidated"] += 1
+        else:
+            self.forget(conn)
+    
+    def stats(self):
+        """Exécutions, préparations et part des exécutions réutilisant une requête préparée"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["statements"] = len(self._statements)
+            stats["connections"] = len(self._prepared)
+        stats["reuse_ratio"] = (
+            round(stats["reused"] / stats["executions"], 4) if stats["executions"] else None
+        )
+        return stats
+
+
+# Registre unique des requêtes préparées
+prepared_statements = PreparedStatementRegistry()
+
+# Erreurs d'une requête préparée périmée sur la session (voir recover)
+STALE_STATEMENT_ERRORS = (InvalidSqlStatementName, FeatureNotSupported)
+
+
+def register_query(name, query):
+    """Enregistre une requête fréquente pour execute_prepared et retourne son nom"""
+    return prepared_statements.register(name, query)
+
+
+def _sql_operation(query) -> str:
+    """Type d'instruction SQL (SELECT, INSERT...) servant de label aux métriques"""
+    words = str(query).split(None, 1)
+    return words[0].upper() if words else "INCONNU"
+
+
+class NotificationListener(threading.Thread):
+    """
+    Écoute un canal PostgreSQL LISTEN/NOTIFY dans un thread dédié
+    
+    Chaque processus (worker) ouvre sa propre connexion d'écoute : une
+    notification émise par n'importe quel worker est reçue par tous.
+    """
+    
+    def __init__(self, channel, callback, on_connect=None, reconnect_delay=5.0, ignore_pid=None):
+        """
+        Args:
+            channel: Nom du canal (LISTEN channel)
+            callback: Fonction appelée avec le payload de chaque notification
+            on_connect: Fonction appelée à chaque reconnexion, pour rattraper
+                        les notifications perdues pendant la coupure
+            reconnect_delay: Délai en secondes avant une nouvelle tentative
+            ignore_pid: Fonction recevant le PID serveur de l'émetteur ; si elle
+                        retourne True, la notification est ignorée
+        """
+        super().__init__(name=f"pg-listen-{channel}", daemon=True)
+        self.channel = channel
+        self.callback = callback
+        self.on_connect = on_connect
+        self.ignore_pid = ignore_pid
+        self.reconnect_delay = reconnect_delay
+        self._stop_event = threading.Event()
+    
+    def stop(self):
+        """Arrête l'écoute"""
+        self._stop_event.set()
+    
+    def run(self):
+        connected_once = False
+        failing = False
+        while not self._stop_event.is_set():
+            conn = None
+            try:
+                # Connexion dédiée : elle reste ouverte pendant toute l'écoute
+                conn = create_connection()
+                conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+                cursor = conn.cursor()
+                cursor.execute(f"LISTEN {self.channel}")
+                cursor.close()
+                
+                if connected_once and self.on_connect:
+                    self.on_connect()
+                connected_once = True
+                failing = False
+                
+                while not self._stop_event.is_set():
+                    # Attente bornée pour pouvoir s'arrêter proprement
+                    if select.select([conn], [], [], 1.0) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        notify = conn.notifies.pop(0)
+                        if self.ignore_pid and self.ignore_pid(notify.pid):
+                            continue
+                        try:
+                            self.callback(notify.payload)
+                        except Exception as e:
+                            print(f"Erreur notification {self.channel}: {e}")
+            except Exception as e:
+                if not failing:
+                    print(f"⚠️ Écoute du canal {self.channel} interrompue: {e}")
+                failing = True
+                self._stop_event.wait(self.reconnect_delay)
+            finally:
+                if conn is not None:
+                    conn.close()
 
 
 def init_database():
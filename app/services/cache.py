@@ -0,0 +1,77 @@
+"""
+Cache en mémoire pour le Chatbot RH
+Cache LRU borné avec expiration (TTL) et compteurs de succès/échecs
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+class LRUCache:
+    """
+    Cache LRU thread-safe avec durée de vie des entrées
+
+    Les entrées les moins récemment utilisées sont évincées au-delà de `maxsize` ;
+    une entrée plus ancienne que `ttl` secondes est considérée comme absente.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        """
+        Args:
+            maxsize: Nombre maximal d'entrées (0 désactive le cache)
+            ttl: Durée de vie d'une entrée en secondes (None : pas d'expiration)
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Retourne la valeur associée à la clé, ou `default` si absente ou expirée"""
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                value, expires_at = item
+                if expires_at is None or expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any):
+        """Ajoute ou remplace une entrée"""
+        if self.maxsize <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable):
+        """Supprime une entrée si elle existe"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Vide le cache (les compteurs sont conservés)"""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict:
+        """Compteurs du cache"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else None,
+            }
@@ -0,0 +1,281 @@
+"""
+Journalisation différée des conversations du chatbot
+Les conversations sont mises en file et écrites par lots par un thread dédié
+"""
+import atexit
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Sequence
+
+from psycopg2.extras import execute_values
+
+from app.database.connection import get_db, execute_query, execute_prepared, register_query
+
+
+class ConversationLogger:
+    """
+    Écriture différée (write-behind) des conversations
+
+    La requête /chat ne fait que mettre la ligne en file : un thread d'arrière-plan
+    l'insère avec les autres dans un INSERT multi-lignes, dès que la file atteint
+    `batch_size` lignes ou au plus tard toutes les `flush_interval` secondes.
+
+    Les identifiants sont réservés par blocs dans la séquence de la table, si bien
+    que l'ID de la conversation est connu immédiatement (pour /chat/feedback).
+    """
+
+    INSERT_QUERY = """
+        INSERT INTO conversations
+        (id, employe_id, session_id, message_utilisateur, intent_detecte, reponse_bot,
+         score_confiance, feedback)
+        VALUES %s
+    """
+    FEEDBACK_QUERY = "UPDATE conversations SET feedback = %s WHERE id = %s RETURNING id"
+    RESERVE_IDS_QUERY = register_query("reserver_ids_conversations", """
+        SELECT nextval(pg_get_serial_sequence('conversations', 'id')) AS id
+        FROM generate_series(1, %s)
+    """)
+
+    def __init__(self, batch_size: int = 200, flush_interval: float = 1.0,
+                 max_queue: int = 10000, put_timeout: float = 0.05, id_block: int = 100):
+        """
+        Args:
+            batch_size: Nombre de lignes déclenchant une écriture
+            flush_interval: Délai maximal (secondes) avant l'écriture d'une ligne
+            max_queue: Taille maximale de la file
+            put_timeout: Attente maximale (secondes) quand la file est pleine
+            id_block: Nombre d'identifiants réservés à la fois
+        """
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.put_timeout = put_timeout
+        self.id_block = id_block
+
+        self._reset()
+        self._closed = False
+        self._stats = {
+            "enqueued": 0,
+            "written": 0,
+            "batches": 0,
+            "backpressured": 0,
+            "dropped": 0,
+            "failed": 0,
+        }
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _reset(self):
+        self._buffer = deque()
+        # IDs en file, IDs en cours d'écriture et feedback reçu avant l'écriture
+        self._queued = set()
+        self._writing = set()
+        self._feedback = {}
+        self._cond = threading.Condition()
+        # Une seule écriture à la fois : flush() rend la main quand tout ce qui a
+        # été mis en file avant son appel est en base
+        self._write_lock = threading.Lock()
+        self._ids = deque()
+        self._ids_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def _after_fork(self):
+        # Le processus enfant repart d'un état vide : la file et les IDs réservés
+        # restent au parent (sinon deux processus utiliseraient les mêmes IDs)
+        stats = self._stats
+        self._reset()
+        self._stats = {key: 0 for key in stats}
+
+    def log(self, employe_id, session_id, message, intent, response, confidence) -> Optional[int]:
+        """
+        Met une conversation en file d'écriture
+
+        Returns:
+            L'ID de la conversation, ou None si elle n'a pas pu être enregistrée
+        """
+        return self.log_many([(employe_id, session_id, message, intent, response, confidence)])[0]
+
+    def log_many(self, rows: Sequence[tuple]) -> List[Optional[int]]:
+        """
+        Met plusieurs conversations en file d'un seul bloc
+        Le bloc est écrit d'un coup par le thread d'écriture (un seul INSERT/commit).
+
+        Args:
+            rows: Tuples (employe_id, session_id, message, intent, response, confidence)
+
+        Returns:
+            Les IDs des conversations, ou des None si le bloc n'a pas pu être enregistré
+        """
+        if not rows:
+            return []
+        conversation_ids = self._reserve_ids(len(rows))
+        entries = [(cid,) + tuple(row) for cid, row in zip(conversation_ids, rows)]
+
+        self._ensure_started()
+        with self._cond:
+            if len(self._buffer) + len(entries) > self.max_queue:
+                # File pleine : on attend brièvement que le thread d'écriture la vide
+                self._stats["backpressured"] += len(entries)
+                self._cond.notify_all()
+                self._cond.wait_for(
+                    lambda: len(self._buffer) + len(entries) <= self.max_queue or self._closed,
+                    timeout=self.put_timeout
+                )
+                if len(self._buffer) + len(entries) > self.max_queue:
+                    self._stats["dropped"] += len(entries)
+                    return [None] * len(entries)
+
+            self._buffer.extend(entries)
+            self._queued.update(conversation_ids)
+            self._stats["enqueued"] += len(entries)
+            # Un bloc de plusieurs lignes est écrit sans attendre le délai
+            if len(entries) > 1 or len(self._buffer) >= self.batch_size:
+                self._cond.notify_all()
+
+        return conversation_ids
+
+    def flush(self):
+        """Écrit immédiatement toutes les conversations en attente"""
+        with self._write_lock:
+            with self._cond:
+                # Le feedback arrivé pendant l'attente part avec la ligne
+                batch = [entry + (self._feedback.pop(entry[0], None),) for entry in self._buffer]
+                self._buffer.clear()
+                self._writing = self._queued
+                self._queued = set()
+                self._cond.notify_all()
+
+            try:
+                if batch:
+                    self._write(batch)
+            finally:
+                with self._cond:
+                    self._writing = set()
+
+    def set_feedback(self, conversation_id: int, feedback: int) -> bool:
+        """
+        Enregistre le feedback (1 ou -1) d'une conversation
+
+        Si la conversation est encore en file dans ce processus, le feedback est
+        écrit avec elle. Sinon la ligne est mise à jour ; tant qu'elle n'existe
+        pas (écriture en cours, ou conversation en file dans un autre worker),
+        la mise à jour est retentée pendant deux délais d'écriture.
+
+        Returns:
+            False si la conversation est restée introuvable
+        """
+        with self._cond:
+            if conversation_id in self._queued:
+                self._feedback[conversation_id] = feedback
+                return True
+
+        deadline = time.monotonic() + 2 * self.flush_interval
+        while True:
+            if execute_query(self.FEEDBACK_QUERY, (feedback, conversation_id),
+                             fetch_one=True, commit=True):
+                return True
+            with self._cond:
+                writing = conversation_id in self._writing
+            if writing:
+                # Attendre la fin de l'écriture en cours dans ce processus
+                with self._write_lock:
+                    continue
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.1)
+
+    def close(self):
+        """Arrête le thread d'écriture après avoir vidé la file"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join(timeout=10)
+        self.flush()
+
+    def stats(self) -> Dict:
+        """Compteurs de la file (lignes écrites, rejetées, en attente...)"""
+        with self._cond:
+            stats = dict(self._stats)
+            stats["pending"] = len(self._buffer)
+        return stats
+
+    def _ensure_started(self):
+        # Le thread est recréé après un fork (un thread ne survit pas au fork)
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._cond:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._run, name="conversation-logger", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: self._closed or len(self._buffer) >= self.batch_size,
+                    timeout=self.flush_interval
+                )
+                closed = self._closed
+            self.flush()
+            if closed:
+                return
+            self._refill_ids()
+
+    def _write(self, batch):
+        conn = None
+        try:
+            conn = get_db()
+            cursor = conn.cursor()
+            execute_values(cursor, self.INSERT_QUERY, batch, page_size=self.batch_size)
+            conn.commit()
+            cursor.close()
+            with self._cond:
+                self._stats["written"] += len(batch)
+                self._stats["batches"] += 1
+        except Exception as e:
+            if conn is not None:
+                conn.rollback()
+            with self._cond:
+                self._stats["failed"] += len(batch)
+            print(f"Erreur log conversation ({len(batch)} lignes): {e}")
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def _reserve_ids(self, count: int) -> List[int]:
+        with self._ids_lock:
+            while len(self._ids) < count:
+                self._fetch_ids(max(self.id_block, count - len(self._ids)))
+            return [self._ids.popleft() for _ in range(count)]
+
+    def _refill_ids(self):
+        # Réserve le bloc suivant hors du chemin des requêtes /chat
+        try:
+            with self._ids_lock:
+                if len(self._ids) < self.id_block // 2:
+                    self._fetch_ids(self.id_block)
+        except Exception as e:
+            print(f"Erreur réservation des IDs de conversation: {e}")
+
+    def _fetch_ids(self, count: int):
+        rows = execute_prepared(self.RESERVE_IDS_QUERY, (count,), fetch_all=True) or []
+        if not rows:
+            raise RuntimeError("Aucun identifiant de conversation réservé")
+        self._ids.extend(row['id'] for row in rows)
+
+
+# Instance singleton du journal des conversations
+conversation_logger = ConversationLogger(
+    batch_size=int(os.environ.get("CONVERSATION_LOG_BATCH_SIZE", 200)),
+    flush_interval=float(os.environ.get("CONVERSATION_LOG_FLUSH_INTERVAL", 1.0)),
+    max_queue=int(os.environ.get("CONVERSATION_LOG_MAX_QUEUE", 10000)),
+)
+atexit.register(conversation_logger.close)
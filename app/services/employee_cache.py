@@ -0,0 +1,109 @@
+"""
+Cache des fiches employés du Chatbot RH
+Instantané des colonnes de la table employes lues à chaque chargement de page
+(profil, /api/auth/me, solde de congés du chatbot)
+"""
+import os
+import threading
+from typing import Dict, Optional
+
+from app.database.connection import execute_prepared, register_query
+from app.database.async_connection import async_db
+from app.services.cache import LRUCache
+
+
+class EmployeeCache:
+    """
+    Fiches employés mises en cache pour une durée limitée (TTL)
+
+    Toute modification de la ligne dans ce processus (solde de congés, mot de
+    passe) doit appeler invalidate(). Les autres workers voient la modification
+    au plus tard à l'expiration de leur entrée.
+    Le mot de passe n'est jamais mis en cache.
+    """
+
+    SNAPSHOT_QUERY = register_query("fiche_employe", """
+        SELECT id, matricule, nom, prenom, email, telephone, role, actif,
+               departement, poste, date_embauche, solde_conges
+        FROM employes WHERE id = %s
+    """)
+
+    def __init__(self, maxsize: int = 4096, ttl: float = 60):
+        """
+        Args:
+            maxsize: Nombre maximal de fiches en cache
+            ttl: Durée de vie d'une fiche en secondes
+        """
+        self._cache = LRUCache(maxsize=maxsize, ttl=ttl)
+        # Incrémenté à chaque invalidation : une lecture commencée avant une
+        # modification ne remet pas l'ancienne fiche en cache
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, employe_id: int) -> Optional[Dict]:
+        """
+        Retourne une copie de la fiche de l'employé, ou None s'il n'existe pas
+        """
+        if employe_id is None:
+            return None
+        employe_id = int(employe_id)
+
+        snapshot = self._cache.get(employe_id)
+        if snapshot is None:
+            generation = self._generation
+            row = execute_prepared(self.SNAPSHOT_QUERY, (employe_id,), fetch_one=True)
+            snapshot = self._store(employe_id, row, generation)
+            if snapshot is None:
+                return None
+        return dict(snapshot)
+
+    async def get_async(self, employe_id: int) -> Optional[Dict]:
+        """
+        Variante asynchrone de get (service ASGI)
+        La fiche absente du cache est lue par asyncpg, sans bloquer la boucle.
+        """
+        if employe_id is None:
+            return None
+        employe_id = int(employe_id)
+
+        snapshot = self._cache.get(employe_id)
+        if snapshot is None:
+            generation = self._generation
+            row = await async_db.fetchrow(self.SNAPSHOT_QUERY, employe_id)
+            snapshot = self._store(employe_id, row, generation)
+            if snapshot is None:
+                return None
+        return dict(snapshot)
+
+    def _store(self, employe_id: int, row, generation: int) -> Optional[Dict]:
+        # Pas de mise en cache si la fiche a été invalidée pendant la lecture
+        if row is None:
+            return None
+        snapshot = dict(row)
+        with self._lock:
+            if generation == self._generation:
+                self._cache.set(employe_id, snapshot)
+        return snapshot
+
+    def invalidate(self, employe_id: int):
+        """Retire la fiche d'un employé après modification de sa ligne"""
+        with self._lock:
+            self._generation += 1
+            self._cache.delete(int(employe_id))
+
+    def clear(self):
+        """Vide le cache (ex: modification de masse de la table employes)"""
+        with self._lock:
+            self._generation += 1
+            self._cache.clear()
+
+    def stats(self) -> Dict:
+        """Compteurs du cache"""
+        return self._cache.stats()
+
+
+# Instance singleton du cache des employés
+employee_cache = EmployeeCache(
+    maxsize=int(os.environ.get("EMPLOYE_CACHE_SIZE", 4096)),
+    ttl=float(os.environ.get("EMPLOYE_CACHE_TTL", 60))
+)
@@ -0,0 +1,117 @@
+"""
+Extraction d'entités à plusieurs niveaux pour le Chatbot RH
+Motifs précompilés d'abord, NER SpaCy seulement si les motifs ne trouvent rien
+"""
+import re
+import threading
+from typing import Dict, List, Optional
+
+# Durées (ex: "5 jours", "2 semaines")
+DUREE_PATTERN = re.compile(r'(\d+)\s*(jours?|semaines?|mois|ans?)\b')
+
+# Dates au format JJ/MM/AAAA ou JJ-MM-AAAA
+DATE_PATTERN = re.compile(r'\d{1,2}[/-]\d{1,2}[/-]\d{2,4}')
+
+# Montants (ex: "150 €", "1 200,50 euros")
+MONTANT_PATTERN = re.compile(r'\d+(?:[ .]\d{3})*(?:[.,]\d{1,2})?\s*(?:€|euros?\b|eur\b)', re.IGNORECASE)
+
+# Correspondance labels SpaCy → catégories d'entités du chatbot
+NER_LABELS = {
+    "DATE": "dates",
+    "MONEY": "montants",
+    "PER": "personnes",
+}
+
+
+def empty_entities() -> Dict[str, List[str]]:
+    return {
+        "dates": [],
+        "montants": [],
+        "durees": [],
+        "personnes": []
+    }
+
+
+class EntityExtractor:
+    """
+    Extraction d'entités en deux niveaux
+
+    1. Niveau rapide : motifs précompilés (durées, dates numériques, montants),
+       sans passer par le modèle statistique.
+    2. Niveau NER : la reconnaissance d'entités SpaCy n'est exécutée sur le Doc
+       que si le niveau rapide n'a rien trouvé.
+
+    Les compteurs par niveau indiquent la part des messages traités par chacun.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {"rapide": 0, "ner": 0, "aucune": 0}
+
+    def extract_fast(self, text: str) -> Dict[str, List[str]]:
+        """Niveau rapide : motifs précompilés uniquement"""
+        entities = empty_entities()
+        entities["durees"] = [f"{d[0]} {d[1]}" for d in DUREE_PATTERN.findall(text.lower())]
+        entities["dates"] = DATE_PATTERN.findall(text)
+        entities["montants"] = [m.strip() for m in MONTANT_PATTERN.findall(text)]
+        return entities
+
+    def extract(self, text: str, doc=None, nlp=None) -> Dict[str, List[str]]:
+        """
+        Extrait les entités d'un message
+
+        Args:
+            text: Le message de l'utilisateur
+            doc: Doc SpaCy du message (tokenisé) ; la NER y est appliquée si nécessaire
+            nlp: Modèle SpaCy (None : niveau rapide uniquement)
+        """
+        entities = self.extract_fast(text)
+        if any(entities.values()):
+            self._count("rapide")
+            return entities
+
+        if nlp is None:
+            self._count("aucune")
+            return entities
+
+        # Un Doc déjà tokenisé passe directement aux composants du pipeline
+        doc = nlp(doc if doc is not None else text)
+        return self._merge_ner(entities, doc)
+
+    def extract_many(self, texts: List[str], docs: List, nlp=None,
+                     batch_size: Optional[int] = None) -> List[Dict[str, List[str]]]:
+        """
+        Équivalent par lot d'extract : la NER des messages qui en ont besoin
+        est exécutée en un seul nlp.pipe
+        """
+        results = [self.extract_fast(text) for text in texts]
+        pending = [i for i, entities in enumerate(results) if not any(entities.values())]
+        self._count("rapide", len(texts) - len(pending))
+
+        if nlp is None:
+            self._count("aucune", len(pending))
+            return results
+
+        inputs = [docs[i] if docs[i] is not None else texts[i] for i in pending]
+        kwargs = {"batch_size": batch_size} if batch_size else {}
+        for i, doc in zip(pending, nlp.pipe(inputs, **kwargs)):
+            results[i] = self._merge_ner(results[i], doc)
+        return results
+
+    def _merge_ner(self, entities: Dict[str, List[str]], doc) -> Dict[str, List[str]]:
+        for ent in doc.ents:
+            key = NER_LABELS.get(ent.label_)
+            if key:
+                entities[key].append(ent.text)
+        self._count("ner" if doc.ents else "aucune")
+        return entities
+
+    def _count(self, tier: str, count: int = 1):
+        if count:
+            with self._lock:
+                self._counters[tier] += count
+
+    def stats(self) -> Dict[str, int]:
+        """Nombre de messages résolus par niveau (rapide, ner, aucune entité)"""
+        with self._lock:
+            return dict(self._counters)
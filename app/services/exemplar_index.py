@@ -0,0 +1,217 @@
+"""
+Index d'exemples pour la détection d'intentions par plus proches voisins
+Exemples issus des conversations validées (feedback positif) et de dataset/intents.csv
+"""
+import csv
+import os
+import threading
+import time
+from typing import Callable, Collection, List, Optional, Tuple
+
+import numpy as np
+
+from app.database.connection import execute_query
+from app.services.intent_index import lowercase_vector
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+INTENTS_CSV = os.path.join(ROOT_DIR, 'dataset', 'intents.csv')
+
+
+class ExemplarIndex:
+    """
+    Vecteurs normalisés des messages exemples, stockés dans une seule matrice float32
+    La recherche des k plus proches voisins (cosinus) est un produit matrice-vecteur
+    suivi d'une sélection partielle (argpartition).
+    """
+
+    def __init__(self, texts: List[str], intents: List[str], vectors: np.ndarray):
+        self.texts = texts
+        self.intents = intents
+        self.vectors = vectors
+        self.built_at = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def search(self, vector: np.ndarray, k: int = 5) -> List[Tuple[str, float, str]]:
+        """
+        Retourne les k exemples les plus proches d'un vecteur
+
+        Returns:
+            Liste de tuples (intention, similarité cosinus, texte de l'exemple)
+        """
+        if not len(self) or not vector.any():
+            return []
+
+        query = (vector / np.linalg.norm(vector)).astype(np.float32)
+        similarities = self.vectors @ query
+        k = min(k, len(self))
+        top = np.argpartition(-similarities, k - 1)[:k]
+        top = top[np.argsort(-similarities[top])]
+        return [(self.intents[i], float(similarities[i]), self.texts[i]) for i in top]
+
+
+def _repair_text(text: str) -> str:
+    """Corrige un texte UTF-8 relu en Windows-1252 (ex: "congÃ©s" → "congés")"""
+    try:
+        return text.encode('cp1252').decode('utf-8')
+    except UnicodeError:
+        return text
+
+
+def load_csv_exemplars(path: str = INTENTS_CSV) -> List[Tuple[str, str]]:
+    """Exemples (message, intention) de dataset/intents.csv"""
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        return [
+            (_repair_text(row['example']), row['intent'])
+            for row in csv.DictReader(f)
+            if row.get('example') and row.get('intent')
+        ]
+
+
+def load_feedback_exemplars(limit: int = 50000) -> List[Tuple[str, str]]:
+    """Conversations confirmées par un feedback positif (message, intention)"""
+    query = """
+        SELECT message_utilisateur, intent_detecte
+        FROM conversations
+        WHERE feedback = 1
+        AND intent_detecte IS NOT NULL
+        AND intent_detecte <> 'unknown'
+        ORDER BY created_at DESC
+        LIMIT %s
+    """
+    rows = execute_query(query, (limit,), fetch_all=True) or []
+    return [(row['message_utilisateur'], row['intent_detecte']) for row in rows]
+
+
+def build_exemplar_index(nlp, exemplars: List[Tuple[str, str]]) -> ExemplarIndex:
+    """Vectorise les exemples en minuscules (tokenisation seule) en éliminant doublons et vecteurs nuls"""
+    seen = set()
+    unique = []
+    for text, intent in exemplars:
+        key = (" ".join(text.lower().split()), intent)
+        if key[0] and key not in seen:
+            seen.add(key)
+            unique.append(key)
+
+    texts, intents, rows = [], [], []
+    for (text, intent), doc in zip(unique, nlp.tokenizer.pipe(t for t, _ in unique)):
+        if doc.vector_norm:
+            texts.append(text)
+            intents.append(intent)
+            rows.append(doc.vector / doc.vector_norm)
+
+    dims = nlp.vocab.vectors_length
+    vectors = np.array(rows, dtype=np.float32) if rows else np.zeros((0, dims), dtype=np.float32)
+    return ExemplarIndex(texts, intents, np.ascontiguousarray(vectors))
+
+
+class ExemplarStore:
+    """
+    Index d'exemples reconstruit périodiquement en arrière-plan
+    Les requêtes utilisent l'index courant sans jamais attendre une reconstruction.
+    """
+
+    # Délai avant une nouvelle tentative après l'échec d'une reconstruction
+    RETRY_DELAY = 60
+
+    def __init__(self, get_nlp, refresh_interval: float = 3600, threshold: float = 0.92,
+                 known_intents: Optional[Callable[[], Collection[str]]] = None,
+                 on_rebuild: Optional[Callable[[], None]] = None):
+        """
+        Args:
+            get_nlp: Fonction retournant le modèle SpaCy (ou None)
+            refresh_interval: Âge maximal de l'index en secondes
+            threshold: Similarité minimale pour retenir l'intention d'un exemple
+            known_intents: Fonction retournant les intentions actives ; les
+                           exemples des autres intentions ne sont pas indexés
+            on_rebuild: Fonction appelée après chaque reconstruction (ex: vider
+                        les réponses mises en cache)
+        """
+        self.get_nlp = get_nlp
+        self.refresh_interval = refresh_interval
+        self.threshold = threshold
+        self.known_intents = known_intents
+        self.on_rebuild = on_rebuild
+        self.index: Optional[ExemplarIndex] = None
+        self._lock = threading.Lock()
+        self._rebuilding = False
+        self._attempted_at = None
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        # Une reconstruction en cours dans le parent n'existe pas dans l'enfant
+        self._lock = threading.Lock()
+        self._rebuilding = False
+
+    def rebuild(self):
+        """Reconstruit l'index (conversations validées + dataset/intents.csv)"""
+        nlp = self.get_nlp()
+        if nlp is None:
+            self.index = ExemplarIndex([], [], np.zeros((0, 0), dtype=np.float32))
+            return
+        exemplars = load_csv_exemplars()
+        try:
+            exemplars += load_feedback_exemplars()
+        except Exception as e:
+            print(f"⚠️ Exemples issus du feedback indisponibles: {e}")
+
+        known = self.known_intents() if self.known_intents else None
+        if known:
+            unknown = sorted({intent for _, intent in exemplars if intent not in known})
+            if unknown:
+                print(f"⚠️ Exemples ignorés, intentions absentes de la table intents: {', '.join(unknown)}")
+                exemplars = [(text, intent) for text, intent in exemplars if intent in known]
+
+        self.index = build_exemplar_index(nlp, exemplars)
+        if self.on_rebuild:
+            self.on_rebuild()
+
+    def _rebuild_in_background(self):
+        try:
+            self.rebuild()
+        except Exception as e:
+            print(f"Erreur reconstruction de l'index d'exemples: {e}")
+        finally:
+            with self._lock:
+                self._rebuilding = False
+
+    def maybe_refresh(self):
+        """Lance une reconstruction en arrière-plan si l'index est absent ou trop ancien"""
+        index = self.index
+        if index is not None and time.monotonic() - index.built_at < self.refresh_interval:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if self._rebuilding:
+                return
+            if self._attempted_at is not None and now - self._attempted_at < self.RETRY_DELAY:
+                return
+            self._rebuilding = True
+            self._attempted_at = now
+        threading.Thread(
+            target=self._rebuild_in_background, name="exemplar-index", daemon=True
+        ).start()
+
+    def match(self, doc, known_intents) -> Optional[Tuple[str, float]]:
+        """
+        Intention de l'exemple le plus proche, si sa similarité dépasse le seuil
+
+        Args:
+            doc: Doc SpaCy du message
+            known_intents: Intentions actives (un exemple d'intention inconnue est ignoré)
+        """
+        self.maybe_refresh()
+        index = self.index
+        if index is None or doc is None or not doc.vector_norm:
+            return None
+
+        for intent, similarity, _ in index.search(lowercase_vector(doc), k=5):
+            if similarity < self.threshold:
+                break
+            if intent in known_intents:
+                return intent, similarity
+        return None
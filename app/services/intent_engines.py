@@ -0,0 +1,176 @@
+"""
+Moteurs de détection d'intentions du Chatbot RH
+Le moteur utilisé par NLPService se choisit avec la variable INTENT_ENGINE
+"""
+import os
+import threading
+from typing import Tuple
+
+import numpy as np
+
+from app.services.intent_index import IntentIndex, lowercase_vector
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+# Artefacts produits par services/training.py
+VECTORIZER_PATH = os.environ.get(
+    "INTENT_VECTORIZER_PATH", os.path.join(ROOT_DIR, 'services', 'vectorizer.pkl')
+)
+CLASSIFIER_PATH = os.environ.get(
+    "INTENT_CLASSIFIER_PATH", os.path.join(ROOT_DIR, 'services', 'classifier.pkl')
+)
+
+# Seuil de confiance minimum du moteur par mots-clés
+KEYWORD_MIN_SCORE = 0.15
+
+
+class IntentEngine:
+    """Interface commune des moteurs de détection d'intentions"""
+
+    name = ""
+
+    def predict(self, text: str, doc, index: IntentIndex) -> Tuple[str, float]:
+        """
+        Prédit l'intention d'un message
+
+        Args:
+            text: Texte prétraité (minuscules, espaces normalisés)
+            doc: Doc SpaCy du message (peut être None)
+            index: Index des intentions actives
+
+        Returns:
+            Tuple (intent_name, score), ("unknown", 0.0) si aucune intention ne convient
+        """
+        raise NotImplementedError
+
+
+class KeywordIntentEngine(IntentEngine):
+    """
+    Moteur par mots-clés et similarité SpaCy
+    Score = correspondances de mots-clés combinées à la similarité sémantique,
+    plus un bonus de priorité de l'intention. Le calcul est vectorisé sur la
+    matrice des intentions de l'index.
+    """
+
+    name = "keyword"
+
+    def predict(self, text: str, doc, index: IntentIndex) -> Tuple[str, float]:
+        # Seules les intentions ayant au moins un mot-clé correspondant sont scorées
+        matches = index.match(text)
+
+        # Les autres n'ont que leur bonus de priorité : la première hors candidates
+        # (intentions triées par priorité décroissante) est la seule à pouvoir gagner
+        fallback_position = next(
+            (position for position in range(len(index)) if position not in matches), None
+        )
+        if not matches and fallback_position is None:
+            return "unknown", 0.0
+
+        positions = np.array(sorted(matches), dtype=np.intp)
+        points = np.array([matches[p] for p in positions], dtype=np.float64)
+
+        # Score des mots-clés, puis combinaison avec la similarité sémantique,
+        # pour toutes les candidates à la fois
+        scores = points / (index.keyword_counts[positions] * 2)
+        # Vecteur du message en minuscules : la casse du Doc partagé ne change pas le score
+        vector = lowercase_vector(doc)
+        norm = float(np.linalg.norm(vector)) if vector.size else 0.0
+        if norm and index.vectors.shape[1]:
+            query = (vector / norm).astype(np.float32)
+            semantic = index.vectors[positions] @ query
+            scores = np.where(
+                index.has_vector[positions], scores * 0.6 + semantic * 0.4, scores
+            )
+        scores = np.minimum(scores, 1.0)
+
+        if fallback_position is not None:
+            positions = np.append(positions, fallback_position)
+            scores = np.append(scores, 0.0)
+            order = np.argsort(positions, kind="stable")
+            positions, scores = positions[order], scores[order]
+
+        # Ajuster le score avec la priorité
+        adjusted = scores + index.priorities[positions] * 0.01
+
+        # argmax retient la première position en cas d'égalité (ordre de priorité)
+        best = int(np.argmax(adjusted))
+        best_score = float(adjusted[best])
+
+        # Seuil de confiance minimum
+        if best_score <= 0 or best_score < KEYWORD_MIN_SCORE:
+            return "unknown", 0.0
+
+        return index.entries[positions[best]]['intent_name'], best_score
+
+
+class LinearIntentEngine(IntentEngine):
+    """
+    Moteur TF-IDF + régression logistique (artefacts de services/training.py)
+
+    Un message coûte une transformation TF-IDF creuse et un produit scalaire par
+    classe. Si la classe prédite n'existe pas dans la table intents ou si la
+    probabilité est trop faible, le moteur de repli est utilisé.
+    """
+
+    name = "linear"
+
+    def __init__(self, fallback: IntentEngine, vectorizer_path: str = VECTORIZER_PATH,
+                 classifier_path: str = CLASSIFIER_PATH, min_confidence: float = 0.5):
+        self.fallback = fallback
+        self.vectorizer_path = vectorizer_path
+        self.classifier_path = classifier_path
+        self.min_confidence = min_confidence
+        self._vectorizer = None
+        self._classifier = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _load(self) -> bool:
+        """Charge les artefacts au premier usage ; False s'ils sont indisponibles"""
+        if self._loaded:
+            return self._classifier is not None
+        with self._lock:
+            if not self._loaded:
+                try:
+                    import joblib
+                    self._vectorizer = joblib.load(self.vectorizer_path)
+                    self._classifier = joblib.load(self.classifier_path)
+                except Exception as e:
+                    self._vectorizer = self._classifier = None
+                    print(f"⚠️ Modèle d'intentions indisponible ({e}). "
+                          f"Exécutez: python services/training.py")
+                self._loaded = True
+        return self._classifier is not None
+
+    def predict(self, text: str, doc, index: IntentIndex) -> Tuple[str, float]:
+        if not self._load():
+            return self.fallback.predict(text, doc, index)
+
+        features = self._vectorizer.transform([text])
+        probabilities = self._classifier.predict_proba(features)[0]
+        best = probabilities.argmax()
+        intent = str(self._classifier.classes_[best])
+        confidence = float(probabilities[best])
+
+        if confidence < self.min_confidence or intent not in index.responses:
+            return self.fallback.predict(text, doc, index)
+
+        return intent, confidence
+
+
+def create_intent_engine(name: str) -> IntentEngine:
+    """
+    Construit le moteur configuré
+
+    Args:
+        name: "keyword" (mots-clés + SpaCy) ou "linear" (TF-IDF + régression logistique)
+    """
+    keyword_engine = KeywordIntentEngine()
+    if name == LinearIntentEngine.name:
+        return LinearIntentEngine(
+            fallback=keyword_engine,
+            min_confidence=float(os.environ.get("INTENT_LINEAR_MIN_CONFIDENCE", 0.5))
+        )
+    if name != KeywordIntentEngine.name:
+        print(f"⚠️ Moteur d'intentions inconnu: {name}, utilisation de '{KeywordIntentEngine.name}'")
+    return keyword_engine
@@ -0,0 +1,367 @@
+"""
+Index des intentions du Chatbot RH
+Structures précalculées à partir de la table intents (mots-clés, vecteurs, réponses)
+"""
+import unicodedata
+from collections import Counter, deque
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+# Correspondance approchée : longueur minimale d'un mot, part minimale de
+# trigrammes communs (coefficient de Dice) et nombre maximal de fautes
+FUZZY_MIN_LENGTH = 4
+FUZZY_MIN_DICE = 0.4
+FUZZY_CACHE_SIZE = 10000
+
+
+def fold_accents(text: str) -> str:
+    """Minuscules sans accents ("Congés" → "conges")"""
+    text = text.lower().replace("œ", "oe").replace("æ", "ae")
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def lowercase_vector(doc) -> np.ndarray:
+    """
+    Vecteur moyen des mots du Doc en minuscules
+    Le Doc partagé garde la casse du message (utile à la NER) ; la similarité
+    sémantique est calculée comme sur le message en minuscules, sans nouvelle
+    tokenisation.
+    """
+    if doc is None or not len(doc):
+        return np.zeros((0,), dtype=np.float32)
+    vocab = doc.vocab
+    return np.mean([vocab.get_vector(token.lower) for token in doc], axis=0)
+
+
+def _trigrams(word: str) -> Set[str]:
+    # Bornes marquées : début et fin de mot comptent comme des trigrammes à part
+    padded = f"${word}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _max_edits(word: str) -> int:
+    return 1 if len(word) <= 6 else 2
+
+
+def _edit_distance(a: str, b: str, limit: int) -> int:
+    """
+    Distance de Damerau-Levenshtein (transpositions adjacentes comprises)
+    Le calcul s'arrête dès que `limit` est dépassé (retourne limit + 1).
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (previous2 is not None and i > 1 and j > 1
+                    and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class KeywordAutomaton:
+    """
+    Automate d'Aho-Corasick sur l'ensemble des mots-clés
+    Trouve en un seul parcours du texte tous les mots-clés qui y apparaissent,
+    quel que soit le nombre d'intentions.
+    """
+
+    def __init__(self, keywords: List[str]):
+        # Chaque état : transitions, lien d'échec, identifiants des mots-clés reconnus
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.output: List[List[int]] = [[]]
+
+        for keyword_id, keyword in enumerate(keywords):
+            self._add(keyword, keyword_id)
+        self._build_failure_links()
+
+    def _add(self, keyword: str, keyword_id: int):
+        state = 0
+        for char in keyword:
+            next_state = self.goto[state].get(char)
+            if next_state is None:
+                next_state = len(self.goto)
+                self.goto[state][char] = next_state
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+            state = next_state
+        self.output[state].append(keyword_id)
+
+    def _build_failure_links(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                self.output[next_state].extend(self.output[self.fail[next_state]])
+
+    def search(self, text: str) -> Set[int]:
+        """Retourne les identifiants des mots-clés présents dans le texte"""
+        found = set()
+        state = 0
+        for char in text:
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+            if self.output[state]:
+                found.update(self.output[state])
+        return found
+
+
+class KeywordMatcher:
+    """
+    Recherche des mots-clés dans un message, sans tenir compte des accents
+
+    - Correspondance exacte : automate d'Aho-Corasick sur les mots-clés sans accents.
+    - Correspondance partielle : index inversé fragment → mots-clés (mot du message
+      contenu dans un mot-clé, ex: "salair" → "salaire"). Les mots d'au moins
+      FUZZY_MIN_LENGTH lettres sont cherchés sans accents ; les mots plus courts
+      tels quels ("et" n'est pas un fragment de "prêt").
+    - Correspondance approchée (fautes de frappe, ex: "conjés" → "congés") : index
+      inversé trigramme → mots-clés. Seuls les mots-clés partageant des trigrammes
+      avec le mot sont comparés (Dice puis distance d'édition), sans parcourir
+      tout le vocabulaire.
+    """
+
+    def __init__(self, keywords: List[str]):
+        self.folded = [fold_accents(keyword) for keyword in keywords]
+        self.automaton = KeywordAutomaton(self.folded)
+        # Fragments courts avec leurs accents, fragments longs sans accents
+        self.short_partial_index = self._build_partial_index(
+            [keyword.lower() for keyword in keywords], max_length=FUZZY_MIN_LENGTH - 1
+        )
+        self.partial_index = self._build_partial_index(self.folded, min_length=FUZZY_MIN_LENGTH)
+        self.trigram_index: Dict[str, List[int]] = {}
+        self.trigram_counts: List[int] = []
+        for keyword_id, keyword in enumerate(self.folded):
+            grams = _trigrams(keyword)
+            self.trigram_counts.append(len(grams))
+            for gram in grams:
+                self.trigram_index.setdefault(gram, []).append(keyword_id)
+        # Résultats des recherches approchées par mot (l'index ne change pas)
+        self._fuzzy_cache: Dict[str, Tuple[int, ...]] = {}
+
+    @staticmethod
+    def _build_partial_index(keywords: List[str], min_length: int = 1,
+                             max_length: Optional[int] = None) -> Dict[str, Set[int]]:
+        """
+        Index inversé des fragments des mots-clés (de min_length à max_length caractères)
+        Un mot du message contenu dans un mot-clé s'y retrouve par une seule recherche.
+        """
+        index: Dict[str, Set[int]] = {}
+        for keyword_id, keyword in enumerate(keywords):
+            longest = len(keyword) if max_length is None else min(len(keyword), max_length)
+            for start in range(len(keyword)):
+                for end in range(start + min_length, min(start + longest, len(keyword)) + 1):
+                    index.setdefault(keyword[start:end], set()).add(keyword_id)
+        return index
+
+    def fuzzy(self, word: str) -> Tuple[int, ...]:
+        """Mots-clés proches d'un mot sans accents (fautes de frappe)"""
+        cached = self._fuzzy_cache.get(word)
+        if cached is not None:
+            return cached
+
+        grams = _trigrams(word)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self.trigram_index.get(gram, ()))
+
+        limit = _max_edits(word)
+        found = tuple(
+            keyword_id for keyword_id, count in shared.items()
+            if 2 * count / (len(grams) + self.trigram_counts[keyword_id]) >= FUZZY_MIN_DICE
+            and _edit_distance(word, self.folded[keyword_id], limit) <= limit
+        )
+
+        if len(self._fuzzy_cache) >= FUZZY_CACHE_SIZE:
+            self._fuzzy_cache.clear()
+        self._fuzzy_cache[word] = found
+        return found
+
+    def match(self, text: str) -> Tuple[Set[int], Set[int]]:
+        """
+        Mots-clés trouvés dans le texte
+
+        Returns:
+            Tuple (identifiants exacts, identifiants partiels ou approchés)
+        """
+        exact = self.automaton.search(fold_accents(text))
+
+        partial = set()
+        for original in set(text.lower().split()):
+            if len(original) < FUZZY_MIN_LENGTH:
+                # Mot court ("et", "à") : sans accent, il serait un fragment de trop de mots-clés
+                partial.update(self.short_partial_index.get(original, ()))
+                continue
+            word = fold_accents(original)
+            fragments = self.partial_index.get(word)
+            if fragments:
+                # Mot du message contenu dans un mot-clé (le cas inverse est déjà exact)
+                partial.update(fragments)
+            else:
+                partial.update(self.fuzzy(word))
+        return exact, partial - exact
+
+    def points(self, text: str) -> int:
+        """Points de correspondance (2 par mot-clé exact, 1 par partiel ou approché)"""
+        exact, partial = self.match(text)
+        return 2 * len(exact) + len(partial)
+
+
+class IntentIndex:
+    """
+    Instantané immuable des intentions actives et de leurs structures de matching.
+
+    Construit une seule fois par chargement des intentions : chaque entrée garde
+    ses mots-clés normalisés et le vecteur SpaCy de ses mots-clés, afin que le
+    traitement d'un message n'ait plus à analyser les mots-clés des intentions.
+    Tous les mots-clés sont compilés dans un KeywordMatcher (correspondances exactes,
+    partielles et approchées, sans tenir compte des accents) : seules les
+    intentions candidates sont ensuite scorées.
+    Les réponses sont indexées par nom d'intention et changent avec l'index.
+    Les vecteurs des intentions forment une matrice NumPy normalisée : la similarité
+    d'un message avec toutes les intentions est un seul produit matrice-vecteur.
+    """
+
+    def __init__(self, intents: List[Dict], nlp=None, reuse: Optional[Dict[str, Dict]] = None):
+        """
+        Args:
+            intents: Intentions actives, triées par priorité décroissante
+            nlp: Modèle SpaCy pour les vecteurs des mots-clés (optionnel)
+            reuse: Entrées déjà préparées par nom d'intention (voir rebuild_with)
+        """
+        reuse = reuse or {}
+        self.intents = intents
+        self.entries = [
+            # Copie : keyword_ids est propre à chaque index
+            dict(reuse[intent['intent_name']]) if intent['intent_name'] in reuse
+            else self._build_entry(intent, nlp)
+            for intent in intents
+        ]
+        self.responses: Dict[str, str] = {
+            intent['intent_name']: intent.get('reponse') for intent in intents
+        }
+
+        # Vocabulaire commun : mot-clé → identifiant, et identifiant → intentions
+        self.keywords: List[str] = []
+        keyword_ids: Dict[str, int] = {}
+        self.postings: List[Set[int]] = []
+        for position, entry in enumerate(self.entries):
+            entry["keyword_ids"] = []
+            for keyword in entry["keywords"]:
+                keyword_id = keyword_ids.get(keyword)
+                if keyword_id is None:
+                    keyword_id = keyword_ids[keyword] = len(self.keywords)
+                    self.keywords.append(keyword)
+                    self.postings.append(set())
+                self.postings[keyword_id].add(position)
+                entry["keyword_ids"].append(keyword_id)
+
+        self.matcher = KeywordMatcher(self.keywords)
+        self._build_matrix()
+
+    def _build_matrix(self):
+        """Matrice des vecteurs normalisés (une ligne par intention) et attributs alignés"""
+        dims = next((e["vector"].shape[0] for e in self.entries if e["vector"] is not None), 0)
+        self.vectors = np.zeros((len(self.entries), dims), dtype=np.float32)
+        for position, entry in enumerate(self.entries):
+            if entry["vector"] is not None and entry["vector_norm"]:
+                self.vectors[position] = entry["vector"] / entry["vector_norm"]
+        self.has_vector = np.array([bool(e["vector_norm"]) for e in self.entries], dtype=bool)
+        self.priorities = np.array([e["priorite"] for e in self.entries], dtype=np.float64)
+        self.keyword_counts = np.array([len(e["keywords"]) for e in self.entries], dtype=np.float64)
+
+    @staticmethod
+    def _build_entry(intent: Dict, nlp) -> Dict:
+        """Prépare une intention : mots-clés en minuscules et vecteur des mots-clés"""
+        keywords = [k for k in (intent.get('mots_cles') or []) if k]
+        entry = {
+            "intent_name": intent['intent_name'],
+            "priorite": intent.get('priorite') or 0,
+            "keywords": [k.lower() for k in keywords],
+            "vector": None,
+            "vector_norm": 0.0,
+        }
+
+        if nlp is not None and keywords:
+            # Tokenisation seule : les vecteurs de mots suffisent, la NER serait inutile
+            doc_keywords = nlp.make_doc(" ".join(keywords))
+            entry["vector"] = doc_keywords.vector
+            entry["vector_norm"] = float(doc_keywords.vector_norm)
+
+        return entry
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def rebuild_with(self, intent_name: str, intent: Optional[Dict], nlp=None) -> "IntentIndex":
+        """
+        Reconstruit un index où une seule intention est remplacée
+
+        Seule l'intention modifiée est préparée (vecteur SpaCy) : les entrées des
+        autres intentions sont reprises telles quelles. Le reste est reconstruit
+        pour toutes les intentions comme par le constructeur (vocabulaire,
+        automate, index des fragments et trigrammes, matrice des vecteurs) : le
+        coût dépend du nombre total de mots-clés, pas de la modification.
+        L'index courant n'est pas modifié et peut continuer à servir les
+        requêtes en cours.
+
+        Args:
+            intent_name: Nom de l'intention à remplacer ou retirer
+            intent: Nouvelle ligne de l'intention, ou None si elle est supprimée/inactive
+        """
+        reuse = {
+            entry["intent_name"]: entry for entry in self.entries
+            if entry["intent_name"] != intent_name
+        }
+        intents = [i for i in self.intents if i['intent_name'] != intent_name]
+        if intent is not None:
+            intents.append(intent)
+            # Même ordre que _load_intents (ORDER BY priorite DESC)
+            intents.sort(key=lambda i: -(i.get('priorite') or 0))
+        return IntentIndex(intents, nlp, reuse=reuse)
+
+    def match(self, text: str) -> Dict[int, int]:
+        """
+        Compte les correspondances de mots-clés pour les intentions candidates
+
+        Args:
+            text: Texte prétraité (minuscules, espaces normalisés)
+
+        Returns:
+            Dict position de l'intention → points de correspondance
+            (2 par mot-clé présent dans le texte, 1 par correspondance partielle
+            ou approchée)
+        """
+        exact, partial = self.matcher.match(text)
+
+        candidates = set()
+        for keyword_id in exact | partial:
+            candidates.update(self.postings[keyword_id])
+
+        matches = {}
+        for position in candidates:
+            points = 0
+            for keyword_id in self.entries[position]["keyword_ids"]:
+                if keyword_id in exact:
+                    points += 2
+                elif keyword_id in partial:
+                    points += 1
+            matches[position] = points
+        return matches
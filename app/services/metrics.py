@@ -0,0 +1,212 @@
+"""
+Métriques de performance du Chatbot RH
+Histogrammes de latence (requêtes HTTP, étapes du traitement, requêtes SQL)
+exposés au format texte Prometheus sur /metrics
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Content-Type du format d'exposition texte de Prometheus
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Bornes des histogrammes en secondes (0,5 ms à 10 s)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Histogram:
+    """
+    Histogramme Prometheus à bornes fixes, une série par combinaison de labels
+    Une observation coûte une recherche dichotomique et un incrément sous verrou.
+    """
+
+    def __init__(self, name: str, description: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Tuple, value: float):
+        """Enregistre une durée (en secondes) pour les labels donnés"""
+        position = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # Compteurs par borne (+Inf en dernier), puis somme
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[position] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, *labels):
+        """Mesure la durée du bloc"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(labels, time.perf_counter() - start)
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self._lock:
+            series = {labels: list(values) for labels, values in self._series.items()}
+
+        for labels, values in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), values[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                label_text = _format_labels(self.label_names, labels, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{label_text} {cumulative}")
+            label_text = _format_labels(self.label_names, labels)
+            lines.append(f"{self.name}_sum{label_text} {values[-1]}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Registre des métriques du processus
+
+    Les histogrammes sont alimentés au fil des requêtes ; les jauges sont lues au
+    moment de l'export, à partir des stats() des composants (cache, journal...).
+    """
+
+    def __init__(self):
+        self._histograms: Dict[str, Histogram] = {}
+        self._gauges: Dict[str, Tuple[str, Callable[[], Dict]]] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str, description: str, label_names: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        """Retourne l'histogramme `name`, créé au premier appel"""
+        with self._lock:
+            if name not in self._histograms:
+                self._histograms[name] = Histogram(name, description, label_names, buckets)
+            return self._histograms[name]
+
+    def register_gauges(self, prefix: str, description: str, collect: Callable[[], Dict]):
+        """
+        Expose les valeurs numériques d'un dictionnaire de statistiques
+
+        Args:
+            prefix: Préfixe des métriques (ex: "chatbot_answer_cache")
+            description: Description commune des métriques
+            collect: Fonction retournant le dictionnaire (ex: LRUCache.stats)
+        """
+        with self._lock:
+            self._gauges[prefix] = (description, collect)
+
+    def render(self) -> str:
+        """Toutes les métriques au format texte Prometheus"""
+        with self._lock:
+            histograms = list(self._histograms.values())
+            gauges = list(self._gauges.items())
+
+        lines = []
+        for histogram in histograms:
+            lines.extend(histogram.render())
+
+        for prefix, (description, collect) in gauges:
+            try:
+                values = collect()
+            except Exception as e:
+                print(f"⚠️ Métriques {prefix} indisponibles: {e}")
+                continue
+            for key, value in values.items():
+                # Les valeurs non numériques (ou None) ne sont pas exportées
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                name = f"{prefix}_{key}"
+                lines.append(f"# HELP {name} {description} ({key})")
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {value}")
+
+        return "\n".join(lines) + "\n"
+
+
+# Registre unique du processus
+metrics = MetricsRegistry()
+
+REQUEST_DURATION = metrics.histogram(
+    "chatbot_http_request_duration_seconds",
+    "Durée des requêtes HTTP par route",
+    ("endpoint", "method", "status")
+)
+STAGE_DURATION = metrics.histogram(
+    "chatbot_stage_duration_seconds",
+    "Durée des étapes du traitement d'un message, par route",
+    ("endpoint", "stage")
+)
+DB_QUERY_DURATION = metrics.histogram(
+    "chatbot_db_query_duration_seconds",
+    "Durée des requêtes SQL (connexion comprise) par type d'instruction",
+    ("operation",)
+)
+DB_POOL_WAIT = metrics.histogram(
+    "chatbot_db_pool_wait_seconds",
+    "Attente d'une connexion du pool PostgreSQL (ouverture comprise)"
+)
+
+
+# Route en cours (modèle d'URL), posée avant chaque requête par app.py
+current_endpoint: ContextVar[str] = ContextVar("current_endpoint", default="hors_requete")
+# Liste recevant les durées au lieu du registre (processus du pool NLP)
+_stage_collector: ContextVar[Optional[list]] = ContextVar("stage_collector", default=None)
+
+
+@contextmanager
+def timed(stage: str):
+    """Mesure la durée d'une étape du traitement (with timed("get_response"): ...)"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        collector = _stage_collector.get()
+        if collector is not None:
+            collector.append((stage, elapsed))
+        else:
+            STAGE_DURATION.observe((current_endpoint.get(), stage), elapsed)
+
+
+@contextmanager
+def collect_stages():
+    """
+    Collecte les durées des étapes du bloc dans une liste au lieu de les enregistrer
+    Utilisé dans les processus du pool NLP, dont le registre n'est pas exporté :
+    le parent enregistre ensuite la liste avec record_stages.
+    """
+    collected: List[Tuple[str, float]] = []
+    token = _stage_collector.set(collected)
+    try:
+        yield collected
+    finally:
+        _stage_collector.reset(token)
+
+
+def record_stages(stages: Sequence[Tuple[str, float]]):
+    """Enregistre des durées collectées ailleurs, sous la route en cours"""
+    endpoint = current_endpoint.get()
+    for stage, seconds in stages:
+        STAGE_DURATION.observe((endpoint, stage), seconds)
@@ -0,0 +1,159 @@
+"""
+Regroupement des requêtes /chat concurrentes
+Les messages arrivés dans une courte fenêtre sont analysés en un seul lot
+"""
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Tuple
+
+from app.services.metrics import current_endpoint
+
+
+class _PendingMessage:
+    __slots__ = ("message", "with_entities", "endpoint", "event", "result", "error")
+
+    def __init__(self, message: str, with_entities: bool):
+        self.message = message
+        self.with_entities = bool(with_entities)
+        # Route de la requête : les étapes du lot lui sont rattachées
+        self.endpoint = current_endpoint.get()
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class MicroBatcher:
+    """
+    Planificateur de micro-lots devant la détection d'intention
+
+    Chaque requête met son message en file et attend son résultat. Un thread
+    dédié attend au plus `window_ms` millisecondes après le premier message (ou
+    `max_batch` messages), puis analyse tout le lot en un seul passage SpaCy
+    (nlp.pipe) et rend à chaque appelant son propre résultat.
+
+    Le délai ajouté à une requête est borné par la fenêtre ; en échange, le coût
+    fixe de chaque passage du modèle est partagé par tout le lot.
+    Si le lot n'a pas rendu de résultat après `timeout` secondes (thread bloqué
+    ou arrêté), l'appelant analyse son message lui-même.
+    """
+
+    def __init__(self, detect: Callable[[List[str], bool], List[Tuple[str, float, Dict]]],
+                 window_ms: float = 0, max_batch: int = 32, timeout: float = 30.0):
+        """
+        Args:
+            detect: Fonction analysant une liste de messages (ex: NLPService._detect)
+            window_ms: Fenêtre de regroupement en millisecondes (0 désactive)
+            max_batch: Nombre de messages déclenchant le lot sans attendre la fenêtre
+            timeout: Attente maximale du résultat au-delà de la fenêtre, en secondes
+        """
+        self.detect = detect
+        self.window = window_ms / 1000.0
+        self.max_batch = max(1, max_batch)
+        self.timeout = timeout
+        self._reset()
+        self._stats = {"messages": 0, "batches": 0, "largest_batch": 0, "timeouts": 0}
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        # Après un fork, les messages en file et le thread restent au parent
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._pid = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > 0
+
+    def submit(self, message: str, with_entities: bool = True) -> Tuple[str, float, Dict]:
+        """
+        Analyse un message au sein du prochain lot
+
+        Returns:
+            Tuple (intent_name, confidence_score, entities)
+        """
+        pending = _PendingMessage(message, with_entities)
+        self._ensure_started()
+        with self._cond:
+            self._queue.append(pending)
+            self._cond.notify_all()
+
+        if not pending.event.wait(self.window + self.timeout):
+            # Lot trop lent : le message est retiré de la file s'il y est encore
+            # et analysé directement par la requête
+            with self._cond:
+                try:
+                    self._queue.remove(pending)
+                except ValueError:
+                    pass
+                self._stats["timeouts"] += 1
+            print(f"⚠️ Micro-lot sans réponse après {self.window + self.timeout:.1f}s, analyse directe")
+            return self.detect([pending.message], pending.with_entities)[0]
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def stats(self) -> Dict:
+        """Compteurs des lots (messages, lots, taille du plus grand lot)"""
+        with self._cond:
+            stats = dict(self._stats)
+            stats["pending"] = len(self._queue)
+        stats["average_batch"] = (
+            round(stats["messages"] / stats["batches"], 2) if stats["batches"] else None
+        )
+        return stats
+
+    def _ensure_started(self):
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._cond:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="chat-micro-batcher", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._queue)
+                # La fenêtre démarre à l'arrivée du premier message du lot
+                deadline = time.monotonic() + self.window
+                while len(self._queue) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = [self._queue.popleft() for _ in range(min(self.max_batch, len(self._queue)))]
+                self._stats["messages"] += len(batch)
+                self._stats["batches"] += 1
+                self._stats["largest_batch"] = max(self._stats["largest_batch"], len(batch))
+            self._process(batch)
+
+    def _process(self, batch: List[_PendingMessage]):
+        # Un passage par route et par option d'extraction des entités présentes dans le lot
+        groups: Dict[Tuple[str, bool], List[_PendingMessage]] = {}
+        for pending in batch:
+            groups.setdefault((pending.endpoint, pending.with_entities), []).append(pending)
+
+        for (endpoint, with_entities), group in groups.items():
+            token = current_endpoint.set(endpoint)
+            try:
+                results = self.detect([pending.message for pending in group], with_entities)
+                if len(results) != len(group):
+                    raise RuntimeError(
+                        f"{len(results)} résultats pour {len(group)} messages"
+                    )
+                for pending, result in zip(group, results):
+                    pending.result = result
+            except Exception as e:
+                print(f"Erreur analyse du micro-lot ({len(group)} messages): {e}")
+                for pending in group:
+                    pending.error = e
+            finally:
+                current_endpoint.reset(token)
+                for pending in group:
+                    pending.event.set()
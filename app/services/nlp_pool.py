@@ -0,0 +1,277 @@
+"""
+Pool de processus pour l'inférence NLP du Chatbot RH
+La détection d'intention et l'extraction d'entités s'exécutent hors des threads
+Flask, dans des processus créés par fork après le chargement du modèle SpaCy
+"""
+import atexit
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait as wait_futures
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Tuple
+
+from app.services.intent_index import IntentIndex
+from app.services.metrics import collect_stages, record_stages
+
+
+def _noop():
+    return None
+
+
+def _detect_in_worker(messages: List[str], with_entities: bool, batch_size: Optional[int],
+                      version: int, snapshot: Optional[Tuple]) -> Tuple:
+    # Exécuté dans un processus du pool : le service hérité du parent (modèle,
+    # index des intentions) est déjà en mémoire, partagé en copy-on-write.
+    # Les durées des étapes sont renvoyées au parent, seul à exporter /metrics.
+    from app.services.nlp_service import nlp_service
+    pool = nlp_service.worker_pool
+    if snapshot is not None and pool._worker_version != version:
+        # Index remplacé dans le parent : entrées déjà préparées, aucun appel SpaCy
+        intents, entries = snapshot
+        nlp_service._set_index(IntentIndex(intents, reuse=entries))
+        pool._worker_version = version
+    with collect_stages() as stages:
+        results = nlp_service.detect_intents(
+            messages, with_entities=with_entities, batch_size=batch_size
+        )
+    return results, stages, os.getpid(), pool._worker_version
+
+
+class NLPWorkerPool:
+    """
+    Pool de processus d'inférence NLP
+
+    Le modèle SpaCy, les intentions et l'index d'exemples sont chargés dans le
+    processus principal avant le fork : les workers partagent ces pages mémoire
+    au lieu de recharger chacun le modèle, et le GIL du serveur n'est plus tenu
+    pendant l'inférence.
+
+    Quand le service publie un nouvel index des intentions, les workers ne sont
+    pas recréés : ses intentions et entrées préparées (vecteurs compris) sont
+    jointes aux tâches jusqu'à ce que chaque worker ait confirmé sa mise à jour.
+    En cas de délai dépassé ou de worker tombé, le pool est relancé ; les blocs
+    déjà terminés sont conservés et seuls les autres sont traités dans le
+    processus courant.
+
+    Les workers sont créés par fork : seul le thread appelant est copié, et un
+    verrou tenu par un autre thread au moment du fork le reste dans l'enfant.
+    Le pool est donc démarré par NLPService.warmup, avant les threads du
+    serveur. Un pool relancé plus tard (délai, crash) est forké depuis un
+    processus multi-thread : les workers n'utilisent que le modèle, l'index des
+    intentions et l'index d'exemples, dont les verrous sont réinitialisés après
+    le fork (register_at_fork).
+    """
+
+    def __init__(self, service, size: int = 0, timeout: float = 10.0):
+        """
+        Args:
+            service: NLPService dont les workers héritent
+            size: Nombre de processus (0 désactive le pool)
+            timeout: Délai maximal (secondes) d'un appel avant repli local
+        """
+        self.service = service
+        self.size = size
+        self.timeout = timeout
+        self._executor = None
+        self._index = None
+        self._pid = None
+        self._lock = threading.Lock()
+        # Version de l'index des intentions publiée aux workers ; _current liste
+        # les workers l'ayant reçue (None : tous, l'index date du fork)
+        self._version = 0
+        self._snapshot = None
+        self._current = None
+        # Dans un worker : version de l'index qu'il utilise
+        self._worker_version = 0
+        self._stats = {
+            "tasks": 0,
+            "messages": 0,
+            "timeouts": 0,
+            "crashes": 0,
+            "restarts": 0,
+            "fallbacks": 0,
+        }
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0
+
+    def _after_fork(self):
+        # Un worker (ou un processus enfant quelconque) n'hérite pas du pool
+        self._executor = None
+        self._index = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Crée le pool et forke ses workers à l'avance (sinon au premier message)"""
+        if self.enabled:
+            self._get_executor()
+
+    def _get_executor(self) -> Tuple[ProcessPoolExecutor, int, Optional[Tuple]]:
+        """Pool courant, version de l'index et copie de l'index à joindre aux tâches"""
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self.service._ensure_intents()
+                self._prepare_parent()
+                others = [t.name for t in threading.enumerate() if t is not threading.current_thread()]
+                if others:
+                    print(f"⚠️ Pool NLP forké avec d'autres threads actifs: {', '.join(others)}")
+                self._index = self.service.intent_index
+                self._version += 1
+                self._worker_version = self._version
+                self._snapshot = None
+                self._current = None
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.size,
+                    mp_context=multiprocessing.get_context("fork")
+                )
+                # Avec fork, le premier submit crée tous les workers : ici, pas au premier message
+                self._executor.submit(_noop).result()
+                self._pid = os.getpid()
+
+            index = self.service.intent_index
+            if index is not self._index:
+                # Nouvel index publié : transmis aux workers avec leurs prochaines tâches
+                self._index = index
+                self._version += 1
+                self._snapshot = None
+                self._current = set()
+
+            snapshot = None
+            if self._current is not None and len(self._current) < self.size:
+                if self._snapshot is None:
+                    self._snapshot = (
+                        [dict(intent) for intent in index.intents],
+                        {entry["intent_name"]: entry for entry in index.entries},
+                    )
+                snapshot = self._snapshot
+            return self._executor, self._version, snapshot
+
+    def _confirm(self, version: int, worker_pid: int, worker_version: int):
+        # Le worker a traité la tâche avec la version courante de l'index
+        with self._lock:
+            if self._current is not None and worker_version == version == self._version:
+                self._current.add(worker_pid)
+
+    def _prepare_parent(self):
+        # Tout ce que les workers utilisent est chargé avant le fork
+        from app.services.nlp_service import get_nlp
+        get_nlp()
+        if self.service.exemplars.index is None:
+            try:
+                self.service.exemplars.rebuild()
+            except Exception as e:
+                print(f"⚠️ Impossible de construire l'index d'exemples: {e}")
+
+    def detect_intents(self, messages: List[str], with_entities: bool = True,
+                       batch_size: Optional[int] = None) -> List[Tuple[str, float, Dict]]:
+        """
+        Détecte intention et entités des messages dans les processus du pool
+        Le lot est réparti en un bloc par worker.
+
+        Returns:
+            Liste de tuples (intent, confiance, entités), dans l'ordre des messages
+        """
+        if not messages:
+            return []
+
+        step = math.ceil(len(messages) / self.size)
+        chunks = [messages[i:i + step] for i in range(0, len(messages), step)]
+        chunk_results: List[Optional[List]] = [None] * len(chunks)
+
+        executor = None
+        try:
+            executor, version, snapshot = self._get_executor()
+            futures = [
+                executor.submit(_detect_in_worker, chunk, with_entities, batch_size, version, snapshot)
+                for chunk in chunks
+            ]
+            done, not_done = wait_futures(futures, timeout=self.timeout)
+            crash = None
+            for position, future in enumerate(futures):
+                if future not in done:
+                    continue
+                try:
+                    chunk_results[position], stages, worker_pid, worker_version = future.result()
+                except BrokenProcessPool as e:
+                    crash = e
+                    continue
+                record_stages(stages)
+                self._confirm(version, worker_pid, worker_version)
+            if crash is not None:
+                raise crash
+            if not_done:
+                print(f"⚠️ Délai dépassé dans le pool NLP ({self.timeout}s), relance du pool")
+                self._recycle(executor, "timeouts")
+        except BrokenProcessPool as e:
+            print(f"⚠️ Worker NLP arrêté ({e}), relance du pool")
+            self._recycle(executor, "crashes")
+
+        missing = [position for position, result in enumerate(chunk_results) if result is None]
+        with self._lock:
+            self._stats["tasks"] += len(chunks) - len(missing)
+            self._stats["messages"] += len(messages) - sum(len(chunks[p]) for p in missing)
+            if missing:
+                self._stats["fallbacks"] += 1
+
+        # Repli : seuls les blocs sans résultat sont traités dans le processus courant
+        if missing:
+            local = iter(self.service.detect_intents(
+                [message for position in missing for message in chunks[position]],
+                with_entities=with_entities, batch_size=batch_size
+            ))
+            for position in missing:
+                chunk_results[position] = [next(local) for _ in chunks[position]]
+        return [result for chunk in chunk_results for result in chunk]
+
+    def _recycle(self, executor, reason: str):
+        with self._lock:
+            self._stats[reason] += 1
+            if executor is not None and self._executor is executor:
+                self._executor = None
+                self._index = None
+                self._stats["restarts"] += 1
+            else:
+                executor = None
+        if executor is not None:
+            self._shutdown(executor, terminate=True)
+
+    @staticmethod
+    def _shutdown(executor: ProcessPoolExecutor, terminate: bool = False):
+        if terminate:
+            # shutdown() n'interrompt pas un worker bloqué : on l'arrête directement
+            for process in list((getattr(executor, "_processes", None) or {}).values()):
+                if process.is_alive():
+                    process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        """Arrête les processus du pool"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+            self._index = None
+        if executor is not None and self._pid == os.getpid():
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def stats(self) -> Dict:
+        """Compteurs du pool (appels, délais dépassés, workers tombés, replis...)"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["size"] = self.size
+        stats["timeout"] = self.timeout
+        return stats
+
+
+def create_worker_pool(service) -> NLPWorkerPool:
+    """Pool configuré par NLP_POOL_SIZE (0 par défaut : désactivé) et NLP_POOL_TIMEOUT"""
+    pool = NLPWorkerPool(
+        service,
+        size=int(os.environ.get("NLP_POOL_SIZE", 0)),
+        timeout=float(os.environ.get("NLP_POOL_TIMEOUT", 10))
+    )
+    atexit.register(pool.shutdown)
+    return pool
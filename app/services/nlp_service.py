@@ -2,48 +2,218 @@
 Service NLP avec SpaCy pour le Chatbot RH
 Détection d'intentions et extraction d'entités
 """
-import spacy
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, Iterator, List, Tuple, Optional
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import contextvars
+import os
 import re
-from app.database.connection import execute_query
+import json
+import threading
+from app.database.connection import execute_prepared, register_query, NotificationListener, db_pool
+from app.services.intent_index import IntentIndex
+from app.services.conversation_logger import conversation_logger
+from app.services.cache import LRUCache
+from app.services.intent_engines import create_intent_engine
+from app.services.exemplar_index import ExemplarStore
+from app.services.entity_extractor import EntityExtractor
+from app.services.nlp_pool import create_worker_pool
+from app.services.micro_batcher import MicroBatcher
+from app.services.spacy_model import SPACY_MODEL, SPACY_FALLBACK_MODEL, load_model
+from app.services.metrics import timed
+from app.services.employee_cache import employee_cache
 
-# Chargement du modèle SpaCy français
-try:
-    nlp = spacy.load("fr_core_news_md")
-except OSError:
-    # Si le modèle n'est pas installé, utiliser le petit modèle
-    try:
-        nlp = spacy.load("fr_core_news_sm")
-    except OSError:
-        nlp = None
-        print("⚠️ Modèle SpaCy non trouvé. Exécutez: python -m spacy download fr_core_news_md")
+# Canal PostgreSQL sur lequel le trigger de la table intents publie ses modifications
+INTENTS_CHANNEL = "intents_changed"
+
+# Lectures de la table intents, préparées une fois par connexion
+INTENTS_ACTIFS = register_query("intents_actifs", """
+    SELECT intent_name, categorie, reponse, mots_cles, priorite 
+    FROM intents 
+    WHERE actif = TRUE 
+    ORDER BY priorite DESC
+""")
+INTENT_PAR_NOM = register_query("intent_par_nom", """
+    SELECT intent_name, categorie, reponse, mots_cles, priorite 
+    FROM intents 
+    WHERE intent_name = %s AND actif = TRUE
+""")
+
+# Taille des lots passés à nlp.pipe par process_messages
+NLP_BATCH_SIZE = int(os.environ.get("NLP_BATCH_SIZE", 64))
+
+_nlp = None
+_nlp_loaded = False
+_nlp_lock = threading.Lock()
+
+
+def get_nlp():
+    """
+    Retourne le modèle SpaCy, chargé au premier appel (et non à l'import du module)
+    Retourne None si aucun modèle français n'est installé.
+    """
+    global _nlp, _nlp_loaded
+    if _nlp_loaded:
+        return _nlp
+    
+    with _nlp_lock:
+        if not _nlp_loaded:
+            try:
+                _nlp = load_model(SPACY_MODEL)
+            except (OSError, ImportError):
+                # Si le modèle n'est pas installé, utiliser le petit modèle
+                try:
+                    _nlp = load_model(SPACY_FALLBACK_MODEL)
+                except (OSError, ImportError):
+                    _nlp = None
+                    print("⚠️ Modèle SpaCy non trouvé. Exécutez: python -m spacy download fr_core_news_md")
+            _nlp_loaded = True
+    return _nlp
 
 
 class NLPService:
     """Service de traitement du langage naturel pour le chatbot RH"""
     
     def __init__(self):
-        self.intents_cache = []
+        self.intent_index = IntentIndex([])
+        self._intents_loaded = False
+        # Sérialise les mises à jour de l'index ; les lectures restent sans verrou
+        self._index_lock = threading.Lock()
+        self._intent_listener = None
+        # Réponses non personnalisées par message normalisé (voir process_message)
+        self.answer_cache = LRUCache(
+            maxsize=int(os.environ.get("ANSWER_CACHE_SIZE", 1024)),
+            ttl=float(os.environ.get("ANSWER_CACHE_TTL", 600))
+        )
+        # Moteur de détection : "keyword" (mots-clés + SpaCy) ou "linear" (TF-IDF)
+        self.intent_engine = create_intent_engine(os.environ.get("INTENT_ENGINE", "keyword"))
+        # Exemples validés (feedback positif, dataset) : sans intention sûre par les
+        # mots-clés, un message très proche d'un exemple reprend son intention
+        self.exemplars = ExemplarStore(
+            get_nlp,
+            refresh_interval=float(os.environ.get("EXEMPLAR_REFRESH_SECONDS", 3600)),
+            threshold=float(os.environ.get("EXEMPLAR_THRESHOLD", 0.92)),
+            known_intents=lambda: self.intent_index.responses,
+            # Les réponses en cache ont pu être calculées avec l'ancien index d'exemples
+            on_rebuild=self.answer_cache.clear
+        )
+        # Score du moteur d'intentions au-delà duquel les exemples ne sont pas consultés
+        self.exemplar_max_score = float(os.environ.get("EXEMPLAR_MAX_ENGINE_SCORE", 0.5))
+        # Entités : motifs précompilés d'abord, NER SpaCy seulement en dernier recours
+        self.entity_extractor = EntityExtractor()
+        # Inférence dans des processus forkés (NLP_POOL_SIZE > 0) plutôt que
+        # dans les threads des requêtes
+        self.worker_pool = create_worker_pool(self)
+        # Requêtes /chat concurrentes regroupées en un seul lot (CHAT_BATCH_WINDOW_MS > 0)
+        self.batcher = MicroBatcher(
+            self._detect,
+            window_ms=float(os.environ.get("CHAT_BATCH_WINDOW_MS", 0)),
+            max_batch=int(os.environ.get("CHAT_BATCH_MAX", 32)),
+            timeout=float(os.environ.get("CHAT_BATCH_TIMEOUT", 30))
+        )
+        # Threads d'analyse du chemin asynchrone (process_message_async), créés au premier usage
+        self.async_workers = int(os.environ.get("ASYNC_NLP_WORKERS", os.cpu_count() or 4))
+        self._async_executor = None
+        self._async_executor_lock = threading.Lock()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._reset_async_executor)
+    
+    def warmup(self):
+        """
+        Charge le modèle SpaCy et les intentions à l'avance, puis démarre le pool NLP
+        Sans appel explicite, ils sont chargés au premier message traité.
+        """
+        get_nlp()
         try:
             self._load_intents()
         except Exception as e:
             print(f"⚠️ Impossible de charger les intentions: {e}")
             print("   Veuillez initialiser la base de données via /init-db")
+        try:
+            self.exemplars.rebuild()
+        except Exception as e:
+            print(f"⚠️ Impossible de construire l'index d'exemples: {e}")
+        # Workers forkés maintenant, avant les threads du serveur
+        self.worker_pool.start()
     
     def _load_intents(self):
         """Charge les intentions depuis la base de données"""
-        query = """
-            SELECT intent_name, categorie, reponse, mots_cles, priorite 
-            FROM intents 
-            WHERE actif = TRUE 
-            ORDER BY priorite DESC
-        """
-        self.intents_cache = execute_query(query, fetch_all=True) or []
+        intents = execute_prepared(INTENTS_ACTIFS, fetch_all=True) or []
+        # Les vecteurs des mots-clés et les réponses sont préparés une seule fois ici.
+        # Le nouvel index remplace l'ancien en une seule affectation : une requête
+        # en cours voit soit l'ancien jeu d'intentions complet, soit le nouveau.
+        index = IntentIndex(intents, get_nlp())
+        with self._index_lock:
+            self._set_index(index)
+            self._intents_loaded = True
+    
+    def _ensure_intents(self):
+        """Charge les intentions au premier usage"""
+        if not self._intents_loaded:
+            self._load_intents()
+    
+    def _set_index(self, index: IntentIndex):
+        """Remplace l'index courant et invalide les réponses mises en cache"""
+        self.intent_index = index
+        self.answer_cache.clear()
+    
+    @property
+    def intents_cache(self) -> List[Dict]:
+        """Intentions actives de l'index courant"""
+        return self.intent_index.intents
     
     def reload_intents(self):
         """Recharge les intentions (utile après modification)"""
         self._load_intents()
     
+    def apply_intent_change(self, intent_name: str):
+        """
+        Applique la modification d'une seule intention à l'index
+        Relit uniquement la ligne concernée et ne recalcule que son vecteur ; les
+        structures de matching sont reconstruites pour toutes les intentions
+        (IntentIndex.rebuild_with), puis le nouvel index est substitué en une
+        seule affectation.
+        """
+        # Lecture sous verrou : deux modifications successives s'appliquent dans l'ordre
+        with self._index_lock:
+            # Tant que l'index n'a pas été chargé, le premier chargement complet suffit
+            if not self._intents_loaded:
+                return
+            intent = execute_prepared(INTENT_PAR_NOM, (intent_name,), fetch_one=True)
+            self._set_index(self.intent_index.rebuild_with(intent_name, intent, get_nlp()))
+    
+    def _on_intents_notification(self, payload: str):
+        """Traite un événement publié par le trigger de la table intents"""
+        event = json.loads(payload)
+        old_name = event.get('old_intent_name')
+        if old_name and old_name != event['intent_name']:
+            # Intention renommée : retirer l'ancien nom
+            self.apply_intent_change(old_name)
+        self.apply_intent_change(event['intent_name'])
+    
+    def start_intent_listener(self):
+        """
+        Démarre l'écoute des modifications d'intentions (LISTEN/NOTIFY)
+        Appelé à chaque requête (app.before_request) : l'écoute démarre une fois
+        par processus, dans le worker qui sert les requêtes et non dans un
+        processus parent qui forke ensuite. Chaque worker applique alors les
+        modifications faites depuis n'importe quel autre worker ; celles faites
+        par ses propres connexions, déjà appliquées, sont ignorées.
+        """
+        if self._intent_listener is not None:
+            return
+        with self._index_lock:
+            if self._intent_listener is not None:
+                return
+            self._intent_listener = NotificationListener(
+                INTENTS_CHANNEL,
+                self._on_intents_notification,
+                # Après une coupure, des notifications ont pu être perdues
+                on_connect=self._load_intents,
+                ignore_pid=db_pool.owns_backend
+            )
+            self._intent_listener.start()
+    
     def preprocess_text(self, text: str) -> str:
         """
         Prétraitement du texte utilisateur
@@ -55,135 +225,101 @@ class NLPService:
         text = re.sub(r'\s+', ' ', text)
         return text
     
-    def extract_entities(self, text: str) -> Dict:
+    def parse(self, text: str):
         """
-        Extrait les entités nommées du texte
-        - Dates
-        - Montants
-        - Durées
+        Analyse un message une seule fois avec SpaCy
+        Le Doc obtenu est partagé par l'extraction d'entités et le calcul de similarité.
+        Seule la tokenisation est exécutée : les vecteurs des mots suffisent à la
+        similarité, et la NER n'est appliquée au Doc par extract_entities que si
+        les motifs rapides ne trouvent rien.
         """
-        entities = {
-            "dates": [],
-            "montants": [],
-            "durees": [],
-            "personnes": []
-        }
-        
+        nlp = get_nlp()
         if nlp is None:
-            return entities
-        
-        doc = nlp(text)
-        
-        for ent in doc.ents:
-            if ent.label_ == "DATE":
-                entities["dates"].append(ent.text)
-            elif ent.label_ == "MONEY":
-                entities["montants"].append(ent.text)
-            elif ent.label_ == "PER":
-                entities["personnes"].append(ent.text)
+            return None
         
-        # Extraction manuelle des durées (ex: "5 jours", "2 semaines")
-        duree_pattern = r'(\d+)\s*(jour|jours|semaine|semaines|mois|an|ans)'
-        durees = re.findall(duree_pattern, text.lower())
-        entities["durees"] = [f"{d[0]} {d[1]}" for d in durees]
-        
-        # Extraction des dates au format JJ/MM/AAAA
-        date_pattern = r'\d{1,2}[/-]\d{1,2}[/-]\d{2,4}'
-        dates_format = re.findall(date_pattern, text)
-        entities["dates"].extend(dates_format)
-        
-        return entities
+        return nlp.make_doc(re.sub(r'\s+', ' ', text.strip()))
     
-    def calculate_similarity(self, text: str, keywords: List[str]) -> float:
-        """
-        Calcule la similarité entre le texte et une liste de mots-clés
-        Utilise une combinaison de correspondance exacte et de similarité sémantique
+    def extract_entities(self, text: str, doc=None) -> Dict:
         """
-        if not keywords:
-            return 0.0
-        
-        text_lower = self.preprocess_text(text)
-        text_words = set(text_lower.split())
-        
-        # Score basé sur les mots-clés présents
-        matches = 0
-        for keyword in keywords:
-            keyword_lower = keyword.lower()
-            # Correspondance exacte ou partielle
-            if keyword_lower in text_lower:
-                matches += 2  # Bonus pour correspondance exacte dans le texte
-            elif any(keyword_lower in word or word in keyword_lower for word in text_words):
-                matches += 1  # Correspondance partielle
-        
-        # Normalisation du score
-        base_score = matches / (len(keywords) * 2) if keywords else 0
+        Extrait les entités nommées du texte
+        - Dates
+        - Montants
+        - Durées
         
-        # Bonus avec SpaCy si disponible
-        if nlp is not None and matches > 0:
-            doc_text = nlp(text_lower)
-            doc_keywords = nlp(" ".join(keywords))
-            
-            if doc_text.vector_norm and doc_keywords.vector_norm:
-                semantic_score = doc_text.similarity(doc_keywords)
-                # Combinaison des scores
-                return min(1.0, (base_score * 0.6) + (semantic_score * 0.4))
+        Les motifs précompilés sont essayés d'abord ; la NER SpaCy n'est exécutée
+        que s'ils ne trouvent rien (voir EntityExtractor).
         
-        return min(1.0, base_score)
+        Args:
+            doc: Doc SpaCy déjà calculé par parse() (optionnel)
+        """
+        return self.entity_extractor.extract(text, doc=doc, nlp=get_nlp())
     
-    def detect_intent(self, text: str) -> Tuple[str, float, Dict]:
+    def detect_intent(self, text: str, doc=None,
+                      with_entities: bool = True) -> Tuple[str, float, Dict]:
         """
         Détecte l'intention principale du message
         
+        Args:
+            text: Le message de l'utilisateur
+            doc: Doc SpaCy déjà calculé par parse() (optionnel)
+            with_entities: Si False, l'extraction d'entités est ignorée
+        
         Returns:
             Tuple (intent_name, confidence_score, entities)
         """
         if not self.intents_cache:
             self._load_intents()
         
-        text_processed = self.preprocess_text(text)
-        entities = self.extract_entities(text)
-        
-        best_intent = "unknown"
-        best_score = 0.0
-        
-        for intent in self.intents_cache:
-            keywords = intent.get('mots_cles') or []
-            score = self.calculate_similarity(text_processed, keywords)
-            
-            # Ajuster le score avec la priorité
-            priority_bonus = intent.get('priorite', 0) * 0.01
-            adjusted_score = score + priority_bonus
-            
-            if adjusted_score > best_score:
-                best_score = adjusted_score
-                best_intent = intent['intent_name']
-        
-        # Seuil de confiance minimum
-        if best_score < 0.15:
-            best_intent = "unknown"
-            best_score = 0.0
+        with timed("preprocess_text"):
+            text_processed = self.preprocess_text(text)
+        
+        # Le message est analysé une seule fois, puis comparé aux vecteurs précalculés
+        if doc is None:
+            with timed("tokenisation"):
+                doc = self.parse(text)
+        
+        entities = {}
+        if with_entities:
+            with timed("extract_entities"):
+                entities = self.extract_entities(text, doc=doc)
+        
+        with timed("similarity"):
+            best_intent, best_score = self.intent_engine.predict(
+                text_processed, doc, self.intent_index
+            )
+        
+        # Sans intention sûre, un message quasi identique à un exemple validé
+        # reprend son intention (une correspondance de mots-clés nette prime)
+        if best_intent == "unknown" or best_score < self.exemplar_max_score:
+            with timed("exemplars"):
+                exemplar = self.exemplars.match(doc, self.intent_index.responses)
+            if exemplar is not None:
+                intent, similarity = exemplar
+                return intent, min(1.0, similarity), entities
         
         return best_intent, min(1.0, best_score), entities
     
     def get_response(self, intent: str) -> str:
         """
         Récupère la réponse associée à une intention
+        Les réponses sont servies depuis l'index en mémoire, sans requête SQL
         """
         if intent == "unknown":
             return ("Je ne suis pas sûr de comprendre votre question. "
                    "Pouvez-vous reformuler ? Vous pouvez me demander de l'aide "
                    "sur les congés, la paie, les avantages sociaux, ou faire une demande.")
         
-        query = "SELECT reponse FROM intents WHERE intent_name = %s AND actif = TRUE"
-        result = execute_query(query, (intent,), fetch_one=True)
+        self._ensure_intents()
+        reponse = self.intent_index.responses.get(intent)
         
-        if result:
-            return result['reponse']
+        if reponse:
+            return reponse
         
         return "Je n'ai pas trouvé de réponse à cette question. Contactez le service RH."
     
     def process_message(self, message: str, employe_id: Optional[int] = None, 
-                       session_id: Optional[str] = None) -> Dict:
+                       session_id: Optional[str] = None,
+                       with_entities: bool = True) -> Dict:
         """
         Traite un message utilisateur complet
         
@@ -191,21 +327,16 @@ class NLPService:
             message: Le message de l'utilisateur
             employe_id: L'ID de l'employé (optionnel)
             session_id: L'ID de session (optionnel)
+            with_entities: Si False, les entités ne sont pas extraites
         
         Returns:
             Dict avec intent, réponse, entités et score de confiance
         """
-        intent, confidence, entities = self.detect_intent(message)
-        response = self.get_response(intent)
-        
-        # Personnalisation de la réponse si l'employé est identifié
-        if employe_id and intent == "conge_solde":
-            solde = self._get_solde_conges(employe_id)
-            if solde is not None:
-                response = f"Votre solde de congés actuel est de {solde} jours. {response}"
+        intent, confidence, entities, response = self.analyse_message(message, with_entities)
+        response = self._personalize(response, intent, employe_id)
         
         # Enregistrement de la conversation
-        self._log_conversation(
+        conversation_id = self._log_conversation(
             employe_id=employe_id,
             session_id=session_id,
             message=message,
@@ -214,37 +345,304 @@ class NLPService:
             confidence=confidence
         )
         
-        result = {
+        return self._build_result(conversation_id, intent, response, confidence, entities)
+    
+    async def process_message_async(self, message: str, employe_id: Optional[int] = None,
+                                    session_id: Optional[str] = None,
+                                    with_entities: bool = True) -> Dict:
+        """
+        Variante asynchrone de process_message (service ASGI, voir asgi.py)
+        
+        L'analyse (SpaCy, index) s'exécute dans un pool de threads ; le solde de
+        congés est lu par asyncpg. La requête n'occupe aucun thread pendant ses
+        attentes : un processus peut suivre des milliers de messages en cours.
+        
+        Returns:
+            Dict identique à celui de process_message
+        """
+        loop = asyncio.get_running_loop()
+        # Le contexte (route en cours pour les métriques) suit le travail dans les threads
+        intent, confidence, entities, response = await loop.run_in_executor(
+            self._get_async_executor(), contextvars.copy_context().run,
+            self.analyse_message, message, with_entities
+        )
+        
+        if employe_id and intent == "conge_solde":
+            with timed("get_solde_conges"):
+                employe = await employee_cache.get_async(employe_id)
+            response = self._with_solde(response, employe['solde_conges'] if employe else None)
+        
+        # La mise en file est immédiate, sauf quand un bloc d'IDs doit être réservé
+        conversation_id = await loop.run_in_executor(
+            None, contextvars.copy_context().run, self._log_conversation,
+            employe_id, session_id, message, intent, response, confidence
+        )
+        
+        return self._build_result(conversation_id, intent, response, confidence, entities)
+    
+    def analyse_message(self, message: str, with_entities: bool = True) -> Tuple:
+        """
+        Analyse d'un message, sans personnalisation ni journalisation
+        
+        Returns:
+            Tuple (intent, confidence, entities, réponse non personnalisée)
+        """
+        self._ensure_intents()
+        index = self.intent_index
+        
+        # Les questions fréquentes sont servies depuis le cache des réponses
+        analysis = self._cached_analysis(message, with_entities, index)
+        if analysis is None:
+            # Un seul passage SpaCy par message, partagé par toutes les étapes
+            detected = self._detect_one(message, with_entities)
+            analysis = self._analyse(message, with_entities, index, *detected)
+        return analysis
+    
+    def stream_message(self, message: str, employe_id: Optional[int] = None,
+                       session_id: Optional[str] = None,
+                       with_entities: bool = True) -> Iterator[Tuple[str, Dict]]:
+        """
+        Variante de process_message qui produit le résultat par étapes (streaming)
+        
+        Événements, dans l'ordre :
+        - "answer" : intention, réponse personnalisée et score de confiance
+        - "suggestions"
+        - "entities" (si demandées) : extraites après l'envoi de la réponse
+        - "done" : ID de la conversation, une fois celle-ci mise en file d'écriture
+        
+        Yields:
+            Tuples (nom de l'événement, données)
+        """
+        self._ensure_intents()
+        index = self.intent_index
+        
+        analysis = self._cached_analysis(message, with_entities, index)
+        if analysis is not None:
+            intent, confidence, entities, response = analysis
+        else:
+            # Intention seule : la réponse part sans attendre les entités
+            intent, confidence, _ = self._detect_one(message, False)
+            with timed("get_response"):
+                response = self.get_response(intent)
+            entities = None
+        
+        personalized = self._personalize(response, intent, employe_id)
+        yield "answer", {
+            "intent": intent,
+            "answer": personalized,
+            "confidence": round(confidence, 4),
+        }
+        yield "suggestions", {"suggestions": self._get_suggestions(intent)}
+        
+        if entities is None:
+            entities = {}
+            if with_entities:
+                with timed("extract_entities"):
+                    entities = self.extract_entities(message)
+            self._cache_analysis(message, with_entities, index,
+                                 (intent, confidence, entities, response))
+        if with_entities:
+            yield "entities", {"entities": entities}
+        
+        conversation_id = self._log_conversation(
+            employe_id=employe_id,
+            session_id=session_id,
+            message=message,
+            intent=intent,
+            response=personalized,
+            confidence=confidence
+        )
+        yield "done", {"conversation_id": conversation_id}
+    
+    def process_messages(self, messages: List[str], employe_id: Optional[int] = None,
+                         session_id: Optional[str] = None, with_entities: bool = True,
+                         batch_size: Optional[int] = None) -> List[Dict]:
+        """
+        Traite un lot de messages en un seul passage SpaCy (nlp.pipe)
+        
+        Args:
+            messages: Les messages à classer
+            employe_id: L'ID de l'employé (optionnel)
+            session_id: L'ID de session (optionnel)
+            with_entities: Si False, les entités ne sont pas extraites
+            batch_size: Taille des lots passés à nlp.pipe (NLP_BATCH_SIZE par défaut)
+        
+        Returns:
+            Liste de Dict (même format que process_message), dans l'ordre des messages
+        """
+        self._ensure_intents()
+        index = self.intent_index
+        
+        analyses = [self._cached_analysis(m, with_entities, index) for m in messages]
+        pending = [i for i, analysis in enumerate(analyses) if analysis is None]
+        
+        detected = self._detect([messages[i] for i in pending], with_entities, batch_size)
+        for i, (intent, confidence, entities) in zip(pending, detected):
+            analyses[i] = self._analyse(messages[i], with_entities, index,
+                                        intent, confidence, entities)
+        
+        responses = [
+            self._personalize(response, intent, employe_id)
+            for intent, _, _, response in analyses
+        ]
+        
+        # Tout le lot est journalisé en une seule écriture
+        try:
+            with timed("log_conversation"):
+                conversation_ids = conversation_logger.log_many([
+                    (employe_id, session_id, message, intent, response, confidence)
+                    for message, (intent, confidence, _, _), response
+                    in zip(messages, analyses, responses)
+                ])
+        except Exception as e:
+            print(f"Erreur log conversation: {e}")
+            conversation_ids = [None] * len(messages)
+        
+        return [
+            self._build_result(conversation_id, intent, response, confidence, entities)
+            for conversation_id, (intent, confidence, entities, _), response
+            in zip(conversation_ids, analyses, responses)
+        ]
+    
+    def detect_intents(self, messages: List[str], with_entities: bool = True,
+                       batch_size: Optional[int] = None) -> List[Tuple[str, float, Dict]]:
+        """
+        Détecte l'intention et les entités de plusieurs messages dans ce processus
+        Tokenisation par lots, puis NER en un seul nlp.pipe pour les messages
+        sans entité évidente.
+        
+        Returns:
+            Liste de tuples (intent_name, confidence_score, entities)
+        """
+        with timed("tokenisation"):
+            docs = self.parse_many(messages, batch_size=batch_size)
+        if with_entities:
+            with timed("extract_entities"):
+                entities = self.entity_extractor.extract_many(
+                    messages, docs, nlp=get_nlp(), batch_size=batch_size or NLP_BATCH_SIZE
+                )
+        else:
+            entities = [{}] * len(messages)
+        
+        return [
+            self.detect_intent(message, doc=doc, with_entities=False)[:2] + (message_entities,)
+            for message, doc, message_entities in zip(messages, docs, entities)
+        ]
+    
+    def _detect_one(self, message: str, with_entities: bool) -> Tuple[str, float, Dict]:
+        """Détection pour un seul message, regroupée avec les requêtes concurrentes si activé"""
+        if self.batcher.enabled:
+            with timed("micro_batch"):
+                return self.batcher.submit(message, with_entities)
+        return self._detect([message], with_entities)[0]
+    
+    def _detect(self, messages: List[str], with_entities: bool,
+                batch_size: Optional[int] = None) -> List[Tuple[str, float, Dict]]:
+        """detect_intents dans le pool de processus s'il est activé, sinon ici"""
+        if self.worker_pool.enabled:
+            # Les étapes internes sont mesurées dans les workers et renvoyées au parent
+            with timed("nlp_pool"):
+                return self.worker_pool.detect_intents(messages, with_entities, batch_size)
+        return self.detect_intents(messages, with_entities=with_entities, batch_size=batch_size)
+    
+    def parse_many(self, texts: List[str], batch_size: Optional[int] = None) -> List:
+        """
+        Tokenise plusieurs messages par lots (équivalent par lot de parse)
+        """
+        nlp = get_nlp()
+        if nlp is None:
+            return [None] * len(texts)
+        
+        batch_size = batch_size or NLP_BATCH_SIZE
+        texts = [re.sub(r'\s+', ' ', text.strip()) for text in texts]
+        return list(nlp.tokenizer.pipe(texts, batch_size=batch_size))
+    
+    def _cached_analysis(self, message: str, with_entities: bool,
+                         index: IntentIndex) -> Optional[Tuple]:
+        """
+        Analyse (intent, confiance, entités, réponse) mise en cache pour ce message
+        Une entrée calculée avec un index remplacé depuis est ignorée.
+        """
+        cached = self.answer_cache.get((self.preprocess_text(message), with_entities))
+        if cached is not None and cached[0] is index:
+            return cached[1:]
+        return None
+    
+    def _analyse(self, message: str, with_entities: bool, index: IntentIndex,
+                 intent: str, confidence: float, entities: Dict) -> Tuple:
+        """Complète l'intention détectée par sa réponse non personnalisée et la met en cache"""
+        with timed("get_response"):
+            response = self.get_response(intent)
+        analysis = (intent, confidence, entities, response)
+        self._cache_analysis(message, with_entities, index, analysis)
+        return analysis
+    
+    def _cache_analysis(self, message: str, with_entities: bool, index: IntentIndex,
+                        analysis: Tuple):
+        """Met en cache une analyse, sauf si l'index a été remplacé entre-temps"""
+        if index is self.intent_index:
+            self.answer_cache.set(
+                (self.preprocess_text(message), with_entities), (index,) + tuple(analysis)
+            )
+    
+    def _personalize(self, response: str, intent: str, employe_id: Optional[int]) -> str:
+        """Personnalisation de la réponse si l'employé est identifié"""
+        if employe_id and intent == "conge_solde":
+            response = self._with_solde(response, self._get_solde_conges(employe_id))
+        return response
+    
+    @staticmethod
+    def _with_solde(response: str, solde) -> str:
+        if solde is None:
+            return response
+        return f"Votre solde de congés actuel est de {solde} jours. {response}"
+    
+    def _get_async_executor(self) -> ThreadPoolExecutor:
+        if self._async_executor is None:
+            with self._async_executor_lock:
+                if self._async_executor is None:
+                    self._async_executor = ThreadPoolExecutor(
+                        max_workers=self.async_workers, thread_name_prefix="nlp-async"
+                    )
+        return self._async_executor
+    
+    def _reset_async_executor(self):
+        # Les threads (pool, écoute LISTEN) restent au parent après un fork
+        self._async_executor = None
+        self._async_executor_lock = threading.Lock()
+        self._intent_listener = None
+        self._index_lock = threading.Lock()
+    
+    def _build_result(self, conversation_id, intent, response, confidence, entities) -> Dict:
+        return {
+            "conversation_id": conversation_id,
             "intent": intent,
             "answer": response,
             "confidence": round(confidence, 4),
             "entities": entities,
             "suggestions": self._get_suggestions(intent)
         }
-        
-        return result
     
     def _get_solde_conges(self, employe_id: int) -> Optional[float]:
         """Récupère le solde de congés d'un employé"""
-        query = "SELECT solde_conges FROM employes WHERE id = %s"
-        result = execute_query(query, (employe_id,), fetch_one=True)
-        return result['solde_conges'] if result else None
+        with timed("get_solde_conges"):
+            employe = employee_cache.get(employe_id)
+        return employe['solde_conges'] if employe else None
     
-    def _log_conversation(self, employe_id, session_id, message, intent, response, confidence):
-        """Enregistre la conversation dans la base de données"""
-        query = """
-            INSERT INTO conversations 
-            (employe_id, session_id, message_utilisateur, intent_detecte, reponse_bot, score_confiance)
-            VALUES (%s, %s, %s, %s, %s, %s)
+    def _log_conversation(self, employe_id, session_id, message, intent, response,
+                          confidence) -> Optional[int]:
+        """
+        Enregistre la conversation dans la base de données
+        L'écriture est différée (voir ConversationLogger) ; l'ID est connu immédiatement.
         """
         try:
-            execute_query(
-                query, 
-                (employe_id, session_id, message, intent, response, confidence),
-                commit=True
-            )
+            with timed("log_conversation"):
+                return conversation_logger.log(
+                    employe_id, session_id, message, intent, response, confidence
+                )
         except Exception as e:
             print(f"Erreur log conversation: {e}")
+            return None
     
     def _get_suggestions(self, intent: str) -> List[str]:
         """Retourne des suggestions basées sur l'intention détectée"""
@@ -0,0 +1,30 @@
+"""
+Chargement du modèle SpaCy du Chatbot RH
+Module sans dépendance vers le reste de l'application : le pipeline allégé peut
+être chargé seul (voir benchmarks/bench_model_load.py).
+"""
+import os
+
+# Modèle SpaCy français et composants inutiles au chatbot.
+# Seuls la tokenisation, les vecteurs de mots et la NER (extract_entities) servent :
+# l'analyse syntaxique, la lemmatisation et la morphologie ne sont pas chargées.
+SPACY_MODEL = os.environ.get("SPACY_MODEL", "fr_core_news_md")
+SPACY_FALLBACK_MODEL = "fr_core_news_sm"
+SPACY_EXCLUDE = [
+    name.strip() for name in os.environ.get(
+        "SPACY_EXCLUDE", "parser,lemmatizer,morphologizer,attribute_ruler,tagger,senter"
+    ).split(",") if name.strip()
+]
+
+
+def load_model(name: str):
+    """Charge le modèle `name` sans les composants de SPACY_EXCLUDE"""
+    import spacy
+    model = spacy.load(name, exclude=SPACY_EXCLUDE)
+    
+    # tok2vec partagé : inutile si aucun composant restant ne l'écoute
+    if "tok2vec" in model.pipe_names:
+        tok2vec = model.get_pipe("tok2vec")
+        if not getattr(tok2vec, "listening_components", None):
+            model.remove_pipe("tok2vec")
+    return model
@@ -0,0 +1,178 @@
+"""
+Chatbot RH - Service ASGI
+POST /chat est servi par la boucle asyncio (NLPService.process_message_async) :
+une requête en attente (analyse, PostgreSQL) n'occupe aucun thread.
+Les autres routes sont celles de l'application Flask (app.py), via asgiref.
+
+Dépendances optionnelles : pip install asyncpg asgiref uvicorn
+Usage:
+    uvicorn asgi:application --host 0.0.0.0 --port 5000 --workers 4
+"""
+import asyncio
+import importlib.util
+import io
+import json
+import os
+import sys
+import uuid
+
+from asgiref.wsgi import WsgiToAsgi
+from flask import session
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+# app.py porte le nom du paquet app : il est chargé depuis son chemin
+_spec = importlib.util.spec_from_file_location("chatbot_wsgi", os.path.join(ROOT, "app.py"))
+_module = importlib.util.module_from_spec(_spec)
+sys.modules["chatbot_wsgi"] = _module
+_spec.loader.exec_module(_module)
+flask_app = _module.app
+
+from app.database.async_connection import async_db
+from app.services.nlp_service import nlp_service
+from app.services.metrics import metrics
+
+metrics.register_gauges("chatbot_async_db_pool", "Pool asyncpg du service ASGI", async_db.stats)
+
+# Taille maximale du corps d'une requête /chat
+MAX_BODY_SIZE = int(os.environ.get("ASGI_MAX_BODY_SIZE", 1024 * 1024))
+
+wsgi_app = WsgiToAsgi(flask_app)
+
+
+async def _read_body(receive):
+    body = b""
+    while True:
+        event = await receive()
+        body += event.get("body", b"")
+        if len(body) > MAX_BODY_SIZE:
+            return None
+        if not event.get("more_body"):
+            return body
+
+
+def _environ(scope, body):
+    """Environnement WSGI de la requête, pour le contexte de requête Flask"""
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf8").decode("latin1"),
+        "PATH_INFO": scope["path"].encode("utf8").decode("latin1"),
+        "QUERY_STRING": scope["query_string"].decode("ascii"),
+        "SERVER_PROTOCOL": f"HTTP/{scope['http_version']}",
+        "SERVER_NAME": scope["server"][0] if scope.get("server") else "localhost",
+        "SERVER_PORT": str(scope["server"][1]) if scope.get("server") else "80",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    if scope.get("client"):
+        environ["REMOTE_ADDR"] = scope["client"][0]
+    for name, value in scope.get("headers", []):
+        name = name.decode("latin1")
+        key = {"content-length": "CONTENT_LENGTH", "content-type": "CONTENT_TYPE"}.get(
+            name, "HTTP_" + name.upper().replace("-", "_")
+        )
+        value = value.decode("latin1")
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+async def _chat_payload(body):
+    """Statut et contenu de la réponse /chat (dans le contexte de requête Flask)"""
+    if body is None:
+        return 413, {"error": "Requête trop volumineuse"}
+    try:
+        data = json.loads(body)
+        message = data.get("message", "").strip()
+
+        if not message:
+            return 400, {
+                "error": "Message vide",
+                "answer": "Veuillez entrer un message."
+            }
+
+        # Récupérer ou créer un ID de session
+        session_id = data.get("session_id") or str(uuid.uuid4())
+
+        result = await nlp_service.process_message_async(
+            message=message,
+            employe_id=session.get("employe_id"),
+            session_id=session_id,
+            with_entities=data.get("entities", True) is not False
+        )
+        result["session_id"] = session_id
+        return 200, result
+
+    except Exception as e:
+        print(f"Erreur chat asynchrone: {e}")
+        return 500, {
+            "error": str(e),
+            "answer": "Une erreur s'est produite. Veuillez réessayer.",
+            "intent": "error"
+        }
+
+
+async def chat(scope, receive, send):
+    """
+    POST /chat (même contrat que chat_controller.chat_api)
+    Body: { "message": "...", "session_id": "..." (optionnel),
+            "entities": true/false (optionnel, true par défaut) }
+
+    La réponse passe par le contexte de requête de Flask : session signée,
+    before_request / after_request (CORS, métriques) et cookie de session
+    s'appliquent comme sur la route WSGI.
+    """
+    body = await _read_body(receive)
+    environ = _environ(scope, body or b"")
+
+    with flask_app.request_context(environ):
+        response = flask_app.preprocess_request()
+        if response is None:
+            status, payload = await _chat_payload(body)
+            response = flask_app.response_class(
+                flask_app.json.dumps(payload), status=status, mimetype="application/json"
+            )
+        else:
+            response = flask_app.make_response(response)
+        response = flask_app.process_response(response)
+
+    data = response.get_data()
+    headers = [(k.lower().encode("latin-1"), v.encode("latin-1"))
+               for k, v in response.headers.items() if k.lower() != "content-length"]
+    headers.append((b"content-length", str(len(data)).encode()))
+    await send({"type": "http.response.start", "status": response.status_code, "headers": headers})
+    await send({"type": "http.response.body", "body": data})
+
+
+async def lifespan(receive, send):
+    """Chargement du modèle au démarrage, fermeture du pool asyncpg à l'arrêt"""
+    while True:
+        event = await receive()
+        if event["type"] == "lifespan.startup":
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, nlp_service.warmup)
+            except Exception as e:
+                print(f"⚠️ Préchargement du service NLP impossible: {e}")
+            await send({"type": "lifespan.startup.complete"})
+        elif event["type"] == "lifespan.shutdown":
+            await async_db.close()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope, receive, send):
+    """Application ASGI : /chat asynchrone, le reste délégué à Flask"""
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+    elif scope["type"] == "http" and scope["path"] == "/chat" and scope["method"] == "POST":
+        await chat(scope, receive, send)
+    elif scope["type"] == "http":
+        await wsgi_app(scope, receive, send)
+    else:
+        raise ValueError(f"Type de connexion non supporté : {scope['type']}")
@@ -0,0 +1,102 @@
+"""
+Mesure du chargement du modèle SpaCy
+Compare le pipeline complet et le pipeline allégé utilisé par NLPService
+(temps de chargement et mémoire résidente maximale).
+
+Chaque mesure s'exécute dans un processus neuf qui ne charge que le pipeline :
+le pipeline allégé est chargé par app.services.spacy_model.load_model, sans
+importer le reste de l'application (base de données, services, Flask). Le
+chargement de SpaCy lui-même (import spacy) est mesuré à part.
+
+Usage:
+    python benchmarks/bench_model_load.py [--model fr_core_news_md] [--repeat 3]
+                                          [--output resultats.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Exécuté dans un processus neuf pour que chaque mesure parte de zéro
+PROBE = r"""
+import json, resource, sys, time
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+import spacy
+import_seconds = time.perf_counter() - start
+rss_import = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+start = time.perf_counter()
+if {trimmed!r}:
+    from app.services.spacy_model import load_model
+    nlp = load_model({model!r})
+else:
+    nlp = spacy.load({model!r})
+load_seconds = time.perf_counter() - start
+start = time.perf_counter()
+nlp("Je voudrais poser 5 jours de congés à partir du 12/07/2024")
+first_doc_seconds = time.perf_counter() - start
+rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{
+    "pipeline": nlp.pipe_names,
+    "import_seconds": import_seconds,
+    "load_seconds": load_seconds,
+    "first_doc_seconds": first_doc_seconds,
+    "max_rss_mb": rss_after / 1024,
+    "model_rss_mb": (rss_after - rss_import) / 1024,
+}}))
+"""
+
+METRICS = ["import_seconds", "load_seconds", "first_doc_seconds", "max_rss_mb", "model_rss_mb"]
+
+
+def measure(model: str, trimmed: bool, repeat: int) -> dict:
+    """Médiane de `repeat` mesures, chacune dans un processus neuf"""
+    code = PROBE.format(root=ROOT, model=model, trimmed=trimmed)
+    runs = []
+    for _ in range(repeat):
+        process = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+        if process.returncode != 0:
+            sys.exit(f"❌ Chargement de {model} impossible :\n{process.stderr.strip()}")
+        runs.append(json.loads(process.stdout.strip().splitlines()[-1]))
+
+    result = {"pipeline": runs[0]["pipeline"], "runs": len(runs)}
+    for metric in METRICS:
+        result[metric] = round(statistics.median(run[metric] for run in runs), 3)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--model", default="fr_core_news_md")
+    parser.add_argument("--repeat", type=int, default=3, help="Processus par pipeline (médiane)")
+    parser.add_argument("--output", help="Fichier JSON des résultats")
+    args = parser.parse_args()
+
+    full = measure(args.model, trimmed=False, repeat=max(1, args.repeat))
+    trimmed = measure(args.model, trimmed=True, repeat=max(1, args.repeat))
+    report = {"model": args.model, "complet": full, "allege": trimmed}
+
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    print(f"\nPipeline   : {', '.join(full['pipeline'])} → {', '.join(trimmed['pipeline'])}")
+    for label, metric, unit in [
+        ("Chargement", "load_seconds", "s"),
+        ("1er message", "first_doc_seconds", "s"),
+        ("RSS modèle", "model_rss_mb", " Mo"),
+        ("RSS max", "max_rss_mb", " Mo"),
+    ]:
+        before, after = full[metric], trimmed[metric]
+        change = f" ({(after - before) / before:+.0%})" if before else ""
+        print(f"{label:<11}: {before}{unit} → {after}{unit}{change}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\nRésultats écrits dans {args.output}")
+
+
+if __name__ == "__main__":
+    main()
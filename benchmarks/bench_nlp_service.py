@@ -0,0 +1,325 @@
+"""
+Benchmark de NLPService (débit et latence de la détection d'intention)
+Corpus RH synthétique construit à partir de dataset/intents.csv et des intentions
+de migrations.sql, base de données remplacée par des données en mémoire.
+Chaque taille d'index (20, 200, 2000 intentions par défaut) est mesurée dans un
+processus neuf pour que la mémoire résidente maximale lui soit propre.
+
+Sans modèle SpaCy français installé, le benchmark s'arrête en erreur : les
+chiffres mesurés sans vecteurs ni NER ne sont pas comparables. --allow-no-model
+le lance quand même, avec un avertissement dans la sortie et les résultats.
+
+Usage:
+    python benchmarks/bench_nlp_service.py [--sizes 20,200,2000] [--messages 2000]
+                                           [--output resultats.json] [--allow-no-model]
+"""
+import argparse
+import csv
+import json
+import math
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MIGRATIONS = os.path.join(ROOT, "migrations.sql")
+INTENTS_CSV = os.path.join(ROOT, "dataset", "intents.csv")
+
+# ('intent_name', 'categorie', 'réponse', ARRAY['mot', ...], priorite)
+INTENT_ROW = re.compile(r"\('(\w+)', '(\w+)', '((?:[^']|'')*)', ARRAY\[([^\]]*)\], (\d+)\)")
+
+TEMPLATES = [
+    "{0}",
+    "comment {0} ?",
+    "je voudrais {0} {1}",
+    "quelle est la procédure pour {0} et {1} ?",
+    "bonjour, j'ai une question sur {0}",
+    "est-ce que je peux {0} pendant 5 jours à partir du 12/07/2024 ?",
+    "mon {0} de 150 € n'apparaît pas, {1} ?",
+]
+OFF_TOPIC = [
+    "bonjour",
+    "merci beaucoup",
+    "quel temps fait-il demain ?",
+    "je ne sais pas",
+    "pouvez-vous m'aider",
+]
+
+
+def percentile(values, pct):
+    """Percentile par rang le plus proche (valeurs triées)"""
+    if not values:
+        return None
+    rank = math.ceil(pct / 100.0 * len(values)) - 1
+    return values[max(0, min(len(values) - 1, rank))]
+
+
+# =============================================
+# Corpus synthétique
+# =============================================
+
+def load_seed_intents():
+    """Intentions de migrations.sql complétées par celles de dataset/intents.csv"""
+    with open(MIGRATIONS, encoding="utf-8-sig") as f:
+        sql = f.read()
+    intents = [
+        {
+            "intent_name": m.group(1),
+            "categorie": m.group(2),
+            "reponse": m.group(3).replace("''", "'"),
+            "mots_cles": re.findall(r"'([^']*)'", m.group(4)),
+            "priorite": int(m.group(5)),
+        }
+        for m in INTENT_ROW.finditer(sql)
+    ]
+
+    sys.path.insert(0, ROOT)
+    from app.services.exemplar_index import load_csv_exemplars
+    known = {intent["intent_name"] for intent in intents}
+    with open(INTENTS_CSV, encoding="utf-8-sig", newline="") as f:
+        answers = {row["intent"]: row["answer"] for row in csv.DictReader(f)}
+    for example, name in load_csv_exemplars(INTENTS_CSV):
+        if name in known:
+            continue
+        known.add(name)
+        words = [w for w in re.findall(r"\w+", example.lower()) if len(w) > 3]
+        intents.append({
+            "intent_name": name,
+            "categorie": "dataset",
+            "reponse": answers.get(name, ""),
+            "mots_cles": words[:5],
+            "priorite": 5,
+        })
+    return intents
+
+
+def build_intents(seed, count, rng):
+    """
+    Étend le jeu d'intentions à `count` entrées
+    Les intentions supplémentaires combinent des mots-clés du vocabulaire RH réel.
+    """
+    intents = [dict(intent) for intent in seed[:count]]
+    vocabulary = sorted({kw for intent in seed for kw in intent["mots_cles"]})
+    while len(intents) < count:
+        base = seed[len(intents) % len(seed)]
+        keywords = rng.sample(vocabulary, k=min(len(vocabulary), rng.randint(3, 6)))
+        intents.append({
+            "intent_name": f"{base['intent_name']}_{len(intents)}",
+            "categorie": base["categorie"],
+            "reponse": base["reponse"],
+            "mots_cles": keywords,
+            "priorite": rng.randint(0, 10),
+        })
+    intents.sort(key=lambda intent: -intent["priorite"])
+    return intents
+
+
+def build_messages(seed, count, rng):
+    """Messages d'employés : gabarits remplis de mots-clés, exemples du dataset, hors sujet"""
+    from app.services.exemplar_index import load_csv_exemplars
+    examples = [text for text, _ in load_csv_exemplars(INTENTS_CSV)]
+    messages = []
+    while len(messages) < count:
+        draw = rng.random()
+        if draw < 0.1:
+            messages.append(rng.choice(OFF_TOPIC))
+        elif draw < 0.2 and examples:
+            messages.append(rng.choice(examples))
+        else:
+            intent = rng.choice(seed)
+            words = intent["mots_cles"] or ["congé"]
+            messages.append(rng.choice(TEMPLATES).format(rng.choice(words), rng.choice(words)))
+    return messages
+
+
+# =============================================
+# Mesure (processus enfant)
+# =============================================
+
+def stub_database(intents):
+    """Remplace les accès PostgreSQL du service par des données en mémoire"""
+    import itertools
+    from app.services import nlp_service as nlp_module
+    from app.services import exemplar_index
+    from app.services import employee_cache as employee_cache_module
+    from app.services.conversation_logger import conversation_logger
+    from app.database.connection import prepared_statements
+
+    by_name = {intent["intent_name"]: intent for intent in intents}
+
+    def execute_query(query, params=None, fetch_one=False, fetch_all=False, commit=False):
+        if "FROM intents" in query:
+            if "WHERE intent_name" in query:
+                return by_name.get(params[0])
+            return list(intents)
+        if "solde_conges" in query:
+            return {"solde_conges": 25.0}
+        return [] if fetch_all else None
+
+    def execute_prepared(name, params=None, **options):
+        return execute_query(prepared_statements.get(name).query, params, **options)
+
+    ids = itertools.count(1)
+    nlp_module.execute_prepared = execute_prepared
+    employee_cache_module.execute_prepared = execute_prepared
+    exemplar_index.execute_query = execute_query
+    conversation_logger.log_many = lambda rows: [next(ids) for _ in rows]
+
+
+def run_one(size, message_count, seed_value, batch_size, allow_no_model=False):
+    import resource
+
+    rng = random.Random(seed_value)
+    seed = load_seed_intents()
+    intents = build_intents(seed, size, rng)
+    messages = build_messages(seed, message_count, rng)
+
+    stub_database(intents)
+    from app.services.nlp_service import nlp_service, get_nlp
+
+    start = time.perf_counter()
+    nlp = get_nlp()
+    model_seconds = time.perf_counter() - start
+    if nlp is None and not allow_no_model:
+        raise SystemExit(
+            f"❌ Aucun modèle SpaCy français chargé ({os.environ.get('SPACY_MODEL')}) : "
+            "python -m spacy download fr_core_news_md, ou --allow-no-model pour mesurer sans modèle"
+        )
+
+    start = time.perf_counter()
+    nlp_service.warmup()
+    index_seconds = time.perf_counter() - start
+
+    # Quelques messages pour amorcer les caches internes de SpaCy
+    for message in messages[:20]:
+        nlp_service.process_message(message)
+
+    latencies = []
+    start = time.perf_counter()
+    for message in messages:
+        t0 = time.perf_counter()
+        nlp_service.process_message(message, employe_id=1, session_id="bench")
+        latencies.append(time.perf_counter() - t0)
+    sequential_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(0, len(messages), batch_size):
+        nlp_service.process_messages(messages[i:i + batch_size], employe_id=1, session_id="bench")
+    batch_seconds = time.perf_counter() - start
+
+    latencies.sort()
+
+    def ms(seconds):
+        return round(seconds * 1000, 3) if seconds is not None else None
+
+    return {
+        "intents": len(nlp_service.intent_index),
+        "messages": len(messages),
+        # Modèle réellement chargé (get_nlp se replie sur fr_core_news_sm)
+        "model_loaded": f"{nlp.lang}_{nlp.meta['name']}" if nlp is not None else None,
+        "pipeline": nlp.pipe_names if nlp is not None else None,
+        "model_load_seconds": round(model_seconds, 3),
+        "index_build_seconds": round(index_seconds, 3),
+        "sequential": {
+            "messages_per_second": round(len(messages) / sequential_seconds, 1),
+            "p50_ms": ms(percentile(latencies, 50)),
+            "p95_ms": ms(percentile(latencies, 95)),
+            "p99_ms": ms(percentile(latencies, 99)),
+            "max_ms": ms(latencies[-1]),
+        },
+        "batch": {
+            "batch_size": batch_size,
+            "messages_per_second": round(len(messages) / batch_seconds, 1),
+        },
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "entity_tiers": nlp_service.entity_extractor.stats(),
+    }
+
+
+# =============================================
+# Orchestration
+# =============================================
+
+def measure(size, args) -> dict:
+    env = dict(os.environ)
+    # Mesure du calcul lui-même : pas de cache de réponses, de pool ni de micro-lots
+    env.update({
+        "ANSWER_CACHE_SIZE": "0" if not args.cache else env.get("ANSWER_CACHE_SIZE", "1024"),
+        "NLP_POOL_SIZE": "0",
+        "CHAT_BATCH_WINDOW_MS": "0",
+        "INTENT_ENGINE": args.engine,
+        "SPACY_MODEL": args.model,
+    })
+    command = [
+        sys.executable, os.path.abspath(__file__), "--run-one", str(size),
+        "--messages", str(args.messages), "--seed", str(args.seed),
+        "--batch-size", str(args.batch_size),
+    ]
+    if args.allow_no_model:
+        command.append("--allow-no-model")
+    process = subprocess.run(command, capture_output=True, text=True, env=env)
+    if process.returncode != 0:
+        sys.exit(process.stderr.strip() or f"Échec de la mesure ({size} intentions)")
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="20,200,2000", help="Nombres d'intentions, séparés par des virgules")
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--model", default=os.environ.get("SPACY_MODEL", "fr_core_news_md"))
+    parser.add_argument("--engine", default="keyword", choices=["keyword", "linear"])
+    parser.add_argument("--cache", action="store_true", help="Garder le cache des réponses actif")
+    parser.add_argument("--output", help="Fichier JSON des résultats")
+    parser.add_argument("--allow-no-model", action="store_true",
+                        help="Mesurer même si aucun modèle SpaCy n'est installé")
+    parser.add_argument("--run-one", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one is not None:
+        result = run_one(args.run_one, args.messages, args.seed, args.batch_size, args.allow_no_model)
+        print(json.dumps(result))
+        return
+
+    runs = []
+    for size in [int(s) for s in args.sizes.split(",") if s.strip()]:
+        result = measure(size, args)
+        runs.append(result)
+        seq = result["sequential"]
+        print(f"{result['intents']:>5} intentions : {seq['messages_per_second']:>8} msg/s "
+              f"(lot : {result['batch']['messages_per_second']} msg/s) | "
+              f"p50 {seq['p50_ms']} ms, p95 {seq['p95_ms']} ms, p99 {seq['p99_ms']} ms | "
+              f"RSS max {result['max_rss_mb']} Mo")
+
+    report = {
+        "benchmark": "nlp_service",
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "model": args.model,
+        "engine": args.engine,
+        "messages": args.messages,
+        "seed": args.seed,
+        "runs": runs,
+    }
+    if any(run["model_loaded"] is None for run in runs):
+        report["warning"] = "Aucun modèle SpaCy chargé : mesures sans vecteurs ni NER, non comparables"
+        print("\n" + "!" * 70)
+        print(f"!! ⚠️  {report['warning']}")
+        print("!" * 70)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\nRésultats écrits dans {args.output}")
+    else:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
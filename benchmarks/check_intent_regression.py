@@ -0,0 +1,82 @@
+"""
+Contrôle de non-régression de la détection d'intention
+Rejoue un corpus fixe de messages (intent_regression_baseline.json) et compare
+les intentions retenues par KeywordIntentEngine à celles enregistrées avant
+la correspondance des mots-clés sans accents.
+
+Deux comparaisons :
+- mots-clés seuls (sans vecteurs) : indépendante du modèle SpaCy installé ;
+- mots-clés et similarité sémantique : seulement si le modèle chargé est celui
+  avec lequel la référence a été enregistrée.
+
+Le corpus ne contient que des messages dont l'intention ne doit pas changer
+(pas de fautes de frappe ni de mots-clés écrits sans leurs accents).
+Sortie en erreur (code 1) à la première différence.
+
+Usage:
+    python benchmarks/check_intent_regression.py
+"""
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "intent_regression_baseline.json")
+
+
+def detect_all(messages, nlp=None):
+    """Intention retenue pour chaque message, sur les intentions de migrations.sql et du dataset"""
+    from bench_nlp_service import load_seed_intents
+    from app.services.intent_engines import KeywordIntentEngine
+    from app.services.intent_index import IntentIndex
+
+    index = IntentIndex(load_seed_intents(), nlp)
+    engine = KeywordIntentEngine()
+    results = []
+    for message in messages:
+        text = " ".join(message.lower().split())
+        doc = nlp.make_doc(text) if nlp is not None else None
+        results.append(engine.predict(text, doc, index)[0])
+    return results
+
+
+def compare(label, messages, expected, actual) -> int:
+    differences = [
+        (message, before, after)
+        for message, before, after in zip(messages, expected, actual) if before != after
+    ]
+    print(f"{label} : {len(messages) - len(differences)}/{len(messages)} intentions identiques")
+    for message, before, after in differences:
+        print(f"   {message!r} : {before} → {after}")
+    return len(differences)
+
+
+def main():
+    sys.path.insert(0, ROOT)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    with open(BASELINE, encoding="utf-8") as f:
+        baseline = json.load(f)
+    messages = [row[0] for row in baseline["messages"]]
+
+    differences = compare(
+        "Mots-clés", messages, [row[1] for row in baseline["messages"]], detect_all(messages)
+    )
+
+    from app.services.nlp_service import get_nlp
+    nlp = get_nlp()
+    model = f"{nlp.lang}_{nlp.meta['name']}-{nlp.meta['version']}" if nlp is not None else None
+    if model == baseline["model"]:
+        differences += compare(
+            "Mots-clés et vecteurs", messages,
+            [row[2] for row in baseline["messages"]], detect_all(messages, nlp)
+        )
+    else:
+        print(f"⚠️ Comparaison sémantique ignorée : modèle {model}, référence {baseline['model']}")
+
+    if differences:
+        sys.exit(f"❌ {differences} intention(s) différente(s) de la référence")
+    print("✅ Aucune différence avec la référence")
+
+
+if __name__ == "__main__":
+    main()
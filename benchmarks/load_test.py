@@ -0,0 +1,320 @@
+"""
+Test de charge HTTP du Chatbot RH
+Rejoue les messages de la table conversations (ou un corpus synthétique) sur /chat,
+mêlés aux appels de l'espace employé (employe.html) et du dashboard gestionnaire
+(gestionnaire.html), puis rapporte débit, latences et taux d'erreur par route.
+
+L'application doit tourner contre une base PostgreSQL locale (python app.py).
+
+Usage:
+    python benchmarks/load_test.py [--base-url http://127.0.0.1:5000] [--duration 60]
+                                   [--concurrency 16] [--rate 0] [--source conversations]
+                                   [--mix chat=0.7,employe=0.2,gestionnaire=0.1]
+                                   [--output resultats.json]
+"""
+import argparse
+import http.cookiejar
+import json
+import math
+import os
+import platform
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Appels en lecture faits par les pages (aucune donnée n'est modifiée)
+EMPLOYE_CALLS = [
+    ("GET", "/api/auth/me"),
+    ("GET", "/api/demandes?employe_id={employe_id}"),
+    ("GET", "/api/notifications?employe_id={employe_id}"),
+    ("GET", "/api/avantages"),
+    ("GET", "/api/employe/profil?employe_id={employe_id}"),
+]
+GESTIONNAIRE_CALLS = [
+    ("GET", "/api/auth/me"),
+    ("GET", "/api/gestionnaire/stats"),
+    ("GET", "/api/gestionnaire/demandes?limit=5"),
+    ("GET", "/api/gestionnaire/demandes?statut=en_attente"),
+    ("GET", "/api/gestionnaire/employes?search="),
+    ("GET", "/api/echeances?periode=30"),
+    ("GET", "/api/gestionnaire/analytics/chatbot"),
+    ("GET", "/api/gestionnaire/intents"),
+]
+
+
+def percentile(values, pct):
+    """Percentile par rang le plus proche (valeurs triées)"""
+    if not values:
+        return None
+    rank = math.ceil(pct / 100.0 * len(values)) - 1
+    return values[max(0, min(len(values) - 1, rank))]
+
+
+# =============================================
+# Messages rejoués
+# =============================================
+
+def load_recorded_messages(limit):
+    """Messages utilisateurs enregistrés dans la table conversations"""
+    sys.path.insert(0, ROOT)
+    from app.database.connection import execute_query
+    query = """
+        SELECT message_utilisateur
+        FROM conversations
+        WHERE message_utilisateur IS NOT NULL AND message_utilisateur <> ''
+        ORDER BY created_at DESC
+        LIMIT %s
+    """
+    rows = execute_query(query, (limit,), fetch_all=True) or []
+    return [row['message_utilisateur'] for row in rows]
+
+
+def load_synthetic_messages(count, seed):
+    """Corpus synthétique du benchmark NLPService (intents.csv + migrations.sql)"""
+    from bench_nlp_service import build_messages, load_seed_intents
+    rng = random.Random(seed)
+    return build_messages(load_seed_intents(), count, rng)
+
+
+# =============================================
+# Client HTTP et statistiques
+# =============================================
+
+class RouteStats:
+    """Latences et erreurs par route, partagées entre les threads"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def record(self, route, seconds, status):
+        with self._lock:
+            stats = self._routes.setdefault(route, {"latencies": [], "errors": 0, "statuses": {}})
+            stats["latencies"].append(seconds)
+            stats["statuses"][status] = stats["statuses"].get(status, 0) + 1
+            if not isinstance(status, int) or not 200 <= status < 300:
+                stats["errors"] += 1
+
+    def report(self, elapsed):
+        with self._lock:
+            routes = {route: dict(stats, latencies=sorted(stats["latencies"]))
+                      for route, stats in self._routes.items()}
+
+        def summary(latencies, errors, statuses=None):
+            count = len(latencies)
+            result = {
+                "requests": count,
+                "requests_per_second": round(count / elapsed, 2) if elapsed else None,
+                "error_rate": round(errors / count, 4) if count else None,
+                "p50_ms": None, "p95_ms": None, "p99_ms": None, "max_ms": None,
+            }
+            for key, pct in (("p50_ms", 50), ("p95_ms", 95), ("p99_ms", 99), ("max_ms", 100)):
+                value = percentile(latencies, pct)
+                result[key] = round(value * 1000, 2) if value is not None else None
+            if statuses is not None:
+                result["statuses"] = {str(k): v for k, v in sorted(statuses.items(), key=str)}
+            return result
+
+        everything = sorted(l for stats in routes.values() for l in stats["latencies"])
+        return {
+            "total": summary(everything, sum(stats["errors"] for stats in routes.values())),
+            "routes": {
+                route: summary(stats["latencies"], stats["errors"], stats["statuses"])
+                for route, stats in sorted(routes.items())
+            },
+        }
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    # Une API non authentifiée redirige vers /login : c'est une erreur, pas un succès
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+class Client:
+    """Session HTTP (cookies conservés) d'un utilisateur simulé"""
+
+    def __init__(self, base_url, timeout):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _NoRedirect()
+        )
+        self.employe_id = None
+
+    def request(self, method, path, body=None):
+        """Retourne (code HTTP ou nom de l'exception, corps décodé)"""
+        data = json.dumps(body).encode("utf-8") if body is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, method=method)
+        req.add_header("Accept", "application/json")
+        if data is not None:
+            req.add_header("Content-Type", "application/json")
+        try:
+            with self.opener.open(req, timeout=self.timeout) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+        except Exception as e:
+            return type(e).__name__, b""
+
+    def login(self, email, password):
+        status, payload = self.request("POST", "/api/auth/login", {"email": email, "password": password})
+        if status != 200:
+            return False
+        self.employe_id = json.loads(payload)["user"]["id"]
+        return True
+
+
+class RateLimiter:
+    """Espace les départs de requêtes pour respecter un débit global (0 : illimité)"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            slot = max(self._next, time.monotonic())
+            self._next = slot + self.interval
+        delay = slot - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+
+# =============================================
+# Scénario
+# =============================================
+
+def worker(args, messages, mix, limiter, stats, deadline, seed):
+    rng = random.Random(seed)
+    chat = Client(args.base_url, args.timeout)
+    employe = Client(args.base_url, args.timeout)
+    gestionnaire = Client(args.base_url, args.timeout)
+    employe_ok = employe.login(args.employe_email or args.gestionnaire_email,
+                               args.employe_password or args.gestionnaire_password)
+    gestionnaire_ok = gestionnaire.login(args.gestionnaire_email, args.gestionnaire_password)
+    if not (employe_ok and gestionnaire_ok):
+        print("⚠️ Connexion impossible pour un utilisateur simulé : "
+              "les appels authentifiés échoueront (401)", file=sys.stderr)
+
+    session_id = str(uuid.uuid4())
+    kinds, weights = zip(*mix.items())
+
+    while time.monotonic() < deadline:
+        limiter.wait()
+        kind = rng.choices(kinds, weights)[0]
+        if kind == "chat":
+            client, method, path = chat, "POST", "/chat"
+            route = "POST /chat"
+            body = {"message": rng.choice(messages), "session_id": session_id}
+        else:
+            client = employe if kind == "employe" else gestionnaire
+            method, template = rng.choice(EMPLOYE_CALLS if kind == "employe" else GESTIONNAIRE_CALLS)
+            path = template.format(employe_id=client.employe_id or "")
+            route = f"{method} {template.split('?')[0]}"
+            body = None
+
+        start = time.perf_counter()
+        status, _ = client.request(method, path, body)
+        stats.record(route, time.perf_counter() - start, status)
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition("=")
+        if name.strip() not in ("chat", "employe", "gestionnaire"):
+            raise argparse.ArgumentTypeError(f"Type d'appel inconnu : {name}")
+        mix[name.strip()] = float(weight or 1)
+    if not mix or not any(mix.values()):
+        raise argparse.ArgumentTypeError("Mélange vide")
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--base-url", default="http://127.0.0.1:5000")
+    parser.add_argument("--duration", type=float, default=60, help="Durée du test en secondes")
+    parser.add_argument("--concurrency", type=int, default=16, help="Nombre d'utilisateurs simultanés")
+    parser.add_argument("--rate", type=float, default=0, help="Requêtes par seconde au total (0 : illimité)")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("chat=0.7,employe=0.2,gestionnaire=0.1"))
+    parser.add_argument("--source", choices=["conversations", "synthetic"], default="conversations",
+                        help="Messages rejoués : table conversations ou corpus synthétique")
+    parser.add_argument("--limit", type=int, default=5000, help="Nombre de messages chargés")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--gestionnaire-email", default="admin@rh.fr")
+    parser.add_argument("--gestionnaire-password", default="admin123")
+    parser.add_argument("--employe-email", help="Compte employé (par défaut : le compte gestionnaire)")
+    parser.add_argument("--employe-password")
+    parser.add_argument("--output", help="Fichier JSON des résultats")
+    args = parser.parse_args()
+
+    messages = []
+    if args.source == "conversations":
+        try:
+            messages = load_recorded_messages(args.limit)
+        except Exception as e:
+            print(f"⚠️ Conversations indisponibles ({e}), corpus synthétique utilisé")
+        if not messages:
+            print("⚠️ Aucune conversation enregistrée, corpus synthétique utilisé")
+    if not messages:
+        messages = load_synthetic_messages(args.limit, args.seed)
+
+    stats = RouteStats()
+    limiter = RateLimiter(args.rate)
+    deadline = time.monotonic() + args.duration
+    threads = [
+        threading.Thread(
+            target=worker,
+            args=(args, messages, args.mix, limiter, stats, deadline, args.seed + i),
+            daemon=True
+        )
+        for i in range(args.concurrency)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    results = stats.report(elapsed)
+    print(f"\n{'Route':<45} {'req':>7} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'erreurs':>8}")
+    for route, summary in list(results["routes"].items()) + [("TOTAL", results["total"])]:
+        columns = ("requests_per_second", "p50_ms", "p95_ms", "p99_ms", "error_rate")
+        print(f"{route:<45} {summary['requests']:>7} "
+              + " ".join(f"{str(summary[column]):>8}" for column in columns))
+
+    report = {
+        "benchmark": "load_test",
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "base_url": args.base_url,
+        "duration_seconds": round(elapsed, 2),
+        "concurrency": args.concurrency,
+        "rate": args.rate,
+        "mix": args.mix,
+        "source": args.source,
+        "messages": len(messages),
+        **results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\nRésultats écrits dans {args.output}")
+
+
+if __name__ == "__main__":
+    main()
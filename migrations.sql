@@ -189,6 +189,30 @@ VALUES ('RH001', 'Admin', 'RH', 'admin@rh.fr', 'Ressources Humaines', 'Gestionna
         '$2b$12$LQv3c1yqBWVHxkd0LHAkCOYz6TtxMQJqhN8/X4W0VpMPgIgxGKJ.G') -- mot de passe: admin123
 ON CONFLICT (email) DO NOTHING;
 
+-- Publication des modifications d'intentions (LISTEN/NOTIFY)
+-- Chaque worker de l'application écoute ce canal et met à jour son index
+CREATE OR REPLACE FUNCTION notify_intents_changed() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        PERFORM pg_notify('intents_changed', json_build_object(
+            'op', TG_OP, 'intent_name', OLD.intent_name)::text);
+    ELSIF TG_OP = 'UPDATE' THEN
+        PERFORM pg_notify('intents_changed', json_build_object(
+            'op', TG_OP, 'intent_name', NEW.intent_name,
+            'old_intent_name', OLD.intent_name)::text);
+    ELSE
+        PERFORM pg_notify('intents_changed', json_build_object(
+            'op', TG_OP, 'intent_name', NEW.intent_name)::text);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_intents_changed ON intents;
+CREATE TRIGGER trg_intents_changed
+    AFTER INSERT OR UPDATE OR DELETE ON intents
+    FOR EACH ROW EXECUTE FUNCTION notify_intents_changed();
+
 -- Index pour améliorer les performances
 CREATE INDEX IF NOT EXISTS idx_demandes_employe ON demandes(employe_id);
 CREATE INDEX IF NOT EXISTS idx_demandes_statut ON demandes(statut);
@@ -2,6 +2,7 @@
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.linear_model import LogisticRegression
 import joblib
+from spacy.lang.fr.stop_words import STOP_WORDS as FRENCH_STOP_WORDS
 import os
 
 INTENTS_CSV = os.path.join('dataset', 'intents.csv')
@@ -16,7 +17,8 @@ def train_model():
     df = df.dropna(subset=['example','intent'])
     X = df['example'].astype(str)
     y = df['intent'].astype(str)
-    vec = TfidfVectorizer(stop_words='french', max_features=5000)
+    # scikit-learn ne fournit que la liste anglaise : on reprend celle de SpaCy
+    vec = TfidfVectorizer(stop_words=list(FRENCH_STOP_WORDS), max_features=5000)
     Xv = vec.fit_transform(X)
     model = LogisticRegression(max_iter=1000)
     model.fit(Xv, y)